@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Exit Sign Detection Inference
+Runs an exported ONNX model (or model bundle) on photos and scores safety
+"""
+
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+from preprocess import Letterboxer, scale_boxes
+from runtime_tuner import load_runtime_profile, onnx_session_options
+from safety_assessment import CLASS_NAMES, calculate_safety_score, load_safety_config
+
+
+def _nms(boxes, scores, iou_threshold):
+    """Greedy NMS over xywh boxes, returns kept indices"""
+    x1 = boxes[:, 0] - boxes[:, 2] / 2
+    y1 = boxes[:, 1] - boxes[:, 3] / 2
+    x2 = boxes[:, 0] + boxes[:, 2] / 2
+    y2 = boxes[:, 1] + boxes[:, 3] / 2
+    areas = boxes[:, 2] * boxes[:, 3]
+
+    order = scores.argsort()[::-1]
+    keep = []
+    while order.size:
+        i = order[0]
+        keep.append(i)
+        w = np.clip(np.minimum(x2[i], x2[order[1:]]) - np.maximum(x1[i], x1[order[1:]]), 0, None)
+        h = np.clip(np.minimum(y2[i], y2[order[1:]]) - np.maximum(y1[i], y1[order[1:]]), 0, None)
+        iou = w * h / (areas[i] + areas[order[1:]] - w * h + 1e-9)
+        order = order[1:][iou <= iou_threshold]
+    return keep
+
+
+def _xywh_to_xyxy(boxes):
+    boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+    return np.concatenate([boxes[:, :2] - boxes[:, 2:] / 2, boxes[:, :2] + boxes[:, 2:] / 2], axis=1)
+
+
+def _box_iou(a, b):
+    """Pairwise IoU between xyxy boxes, shape [len(a), len(b)]"""
+    top_left = np.maximum(a[:, None, :2], b[None, :, :2])
+    bottom_right = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.clip(bottom_right - top_left, 0, None).prod(axis=2)
+    area_a = (a[:, 2:] - a[:, :2]).prod(axis=1)
+    area_b = (b[:, 2:] - b[:, :2]).prod(axis=1)
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-9)
+
+
+def _average_precision(recall, precision):
+    """101-point interpolated AP over the precision envelope (COCO / ultralytics)"""
+    recall = np.concatenate([[0.0], recall, [1.0]])
+    precision = np.flip(np.maximum.accumulate(np.flip(np.concatenate([[1.0], precision, [0.0]]))))
+    interpolated = np.interp(np.linspace(0, 1, 101), recall, precision)
+    return float((interpolated[1:] + interpolated[:-1]).sum() / 2 / 100)  # Trapezoid rule on the 0.01 grid
+
+
+def _load_labels(label_path: Path, width, height):
+    """Class ids and pixel xyxy boxes from a YOLO label file (boxes or polygons, like ultralytics)"""
+    classes, boxes = [], []
+    if label_path.exists():
+        for line in label_path.read_text().splitlines():
+            values = line.split()
+            if not values:
+                continue
+            coords = np.array(values[1:], dtype=np.float32)
+            if len(coords) == 4:
+                box = _xywh_to_xyxy(coords)[0]
+            else:
+                # Segmentation polygon: use its bounding box
+                points = coords.reshape(-1, 2)
+                box = np.concatenate([points.min(axis=0), points.max(axis=0)])
+            classes.append(int(values[0]))
+            boxes.append(box * [width, height, width, height])
+    return np.array(classes, dtype=int), np.array(boxes, dtype=np.float32).reshape(-1, 4)
+
+
+def evaluate_map(detector, image_paths, conf: float = 0.001, iou: float = 0.7, max_det: int = 300):
+    """
+    Validation mAP of an exported model at its own input shape
+    Every image goes through the detector's letterboxing and session, so a rectangular
+    export is scored at exactly its rectangular shape
+    Args:
+        detector: ExitSignDetector on the exported model
+        image_paths: Images with YOLO label files under the matching labels/ directory
+        conf, iou, max_det: Evaluation thresholds (ultralytics val defaults)
+    Returns:
+        Dict with mAP50, mAP50-95 and per-class AP50-95
+    """
+    iou_thresholds = np.linspace(0.5, 0.95, 10)
+    detector.confidence_threshold, detector.iou_threshold = conf, iou
+    matches, scores, pred_classes, label_classes = [], [], [], []
+
+    for image_path in image_paths:
+        image_path = Path(image_path)
+        tensor, meta = detector.letterboxer(image_path)
+        output = detector.session.run(None, {detector.input_name: tensor})[0]
+        detections = sorted(detector._decode(output[0], meta), key=lambda d: -d['confidence'])[:max_det]
+
+        width, height = meta['original_size']
+        label_path = Path(str(image_path.parent).replace('images', 'labels')) / f'{image_path.stem}.txt'
+        gt_classes, gt_boxes = _load_labels(label_path, width, height)
+        label_classes.append(gt_classes)
+
+        pred_boxes = _xywh_to_xyxy([d['bbox'] for d in detections])
+        classes = np.array([d['class_id'] for d in detections], dtype=int)
+        correct = np.zeros((len(detections), len(iou_thresholds)), dtype=bool)
+        if len(detections) and len(gt_classes):
+            # Same-class matches only, each label claimed by its highest-IoU prediction
+            ious = _box_iou(gt_boxes, pred_boxes) * (gt_classes[:, None] == classes[None, :])
+            for t, threshold in enumerate(iou_thresholds):
+                gt_index, pred_index = np.nonzero(ious >= threshold)
+                if not len(gt_index):
+                    continue
+                order = ious[gt_index, pred_index].argsort()[::-1]
+                gt_index, pred_index = gt_index[order], pred_index[order]
+                _, first = np.unique(pred_index, return_index=True)
+                gt_index, pred_index = gt_index[first], pred_index[first]
+                _, first = np.unique(gt_index, return_index=True)
+                correct[pred_index[first], t] = True
+
+        matches.append(correct)
+        scores.append(np.array([d['confidence'] for d in detections], dtype=np.float32))
+        pred_classes.append(classes)
+
+    matches = np.concatenate(matches) if matches else np.zeros((0, len(iou_thresholds)), dtype=bool)
+    scores = np.concatenate(scores) if scores else np.zeros(0)
+    pred_classes = np.concatenate(pred_classes) if pred_classes else np.zeros(0, dtype=int)
+    label_classes = np.concatenate(label_classes) if label_classes else np.zeros(0, dtype=int)
+
+    order = scores.argsort()[::-1]
+    matches, pred_classes = matches[order], pred_classes[order]
+    ap = {}
+    for class_id in np.unique(label_classes):
+        class_matches = matches[pred_classes == class_id]
+        if not len(class_matches):
+            ap[detector.class_names[class_id]] = [0.0] * len(iou_thresholds)
+            continue
+        num_labels = int((label_classes == class_id).sum())
+        true_positives = class_matches.cumsum(axis=0)
+        false_positives = (~class_matches).cumsum(axis=0)
+        recall = true_positives / num_labels
+        precision = true_positives / np.maximum(true_positives + false_positives, 1)
+        ap[detector.class_names[class_id]] = [
+            _average_precision(recall[:, t], precision[:, t]) for t in range(len(iou_thresholds))
+        ]
+
+    per_class = np.array(list(ap.values())) if ap else np.zeros((0, len(iou_thresholds)))
+    return {
+        'mAP50': float(per_class[:, 0].mean()) if len(per_class) else 0.0,
+        'mAP50-95': float(per_class.mean()) if len(per_class) else 0.0,
+        'per_class_ap': {name: float(np.mean(values)) for name, values in ap.items()},
+    }
+
+
+class ExitSignDetector:
+    """ONNX Runtime exit sign detector with fast JPEG preprocessing"""
+
+    def __init__(self, model_path, config_path=None, session_options=None):
+        """
+        Args:
+            model_path: Exported .onnx model or .bundle file
+            config_path: safety_assessment_config.yaml (defaults to the one next to the model)
+            session_options: Optional onnxruntime.SessionOptions (defaults to this host's tuned profile)
+        """
+        import onnxruntime as ort
+
+        model_path = Path(model_path)
+        providers = ['CPUExecutionProvider']
+
+        if model_path.suffix == '.bundle':
+            from model_bundle import load_bundle
+            self.bundle = load_bundle(model_path)
+            self.runtime_profile = self.bundle.runtime_profile('onnx')
+            self.session = self.bundle.create_onnx_session(sess_options=session_options, providers=providers)
+            self.config = self.bundle.metadata.get('config', {})
+        else:
+            self.bundle = None
+            self.runtime_profile = load_runtime_profile(model_path)
+            if session_options is None:
+                session_options = onnx_session_options(self.runtime_profile)
+            self.session = ort.InferenceSession(str(model_path), session_options, providers=providers)
+            config_path = config_path or model_path.parent / 'safety_assessment_config.yaml'
+            self.config = load_safety_config(config_path)
+
+        model_info = self.config.get('model_info', {})
+        self.class_names = model_info.get('classes', CLASS_NAMES)
+        self.confidence_threshold = model_info.get('confidence_threshold', 0.5)
+        self.iou_threshold = model_info.get('iou_threshold', 0.45)
+
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        self.input_shape = tuple(model_input.shape[2:4])
+        self.embedded_nms = self.session.get_outputs()[0].shape[-1] == 6
+        self.letterboxer = Letterboxer(self.input_shape)
+
+        # Preferred batch size for batched callers (fixed-shape exports only take their own)
+        batch_dim = model_input.shape[0]
+        self.batch_size = batch_dim if isinstance(batch_dim, int) else (self.runtime_profile or {}).get('batch_size', 1)
+
+    def _decode(self, output, meta):
+        """Turn one image's model output into detection dicts in original image coordinates"""
+        if self.embedded_nms:
+            # [max_det, 6]: x1, y1, x2, y2, score, class_id (zero-padded)
+            rows = output[output[:, 4] > self.confidence_threshold]
+            boxes = np.stack([(rows[:, 0] + rows[:, 2]) / 2, (rows[:, 1] + rows[:, 3]) / 2,
+                              rows[:, 2] - rows[:, 0], rows[:, 3] - rows[:, 1]], axis=1)
+            scores, class_ids = rows[:, 4], rows[:, 5].astype(int)
+        else:
+            # [4 + classes, anchors]: cx, cy, w, h, class scores
+            predictions = output.T
+            class_scores = predictions[:, 4:]
+            class_ids = class_scores.argmax(axis=1)
+            scores = class_scores[np.arange(len(class_ids)), class_ids]
+            mask = scores > self.confidence_threshold
+            boxes, scores, class_ids = predictions[mask, :4], scores[mask], class_ids[mask]
+
+            keep = []
+            for class_id in np.unique(class_ids):
+                indices = np.where(class_ids == class_id)[0]
+                keep.extend(indices[_nms(boxes[indices], scores[indices], self.iou_threshold)])
+            boxes, scores, class_ids = boxes[keep], scores[keep], class_ids[keep]
+
+        boxes = scale_boxes(boxes, meta)
+        return [
+            {
+                'bbox': box.tolist(),
+                'confidence': float(score),
+                'class_id': int(class_id),
+                'class_name': self.class_names[int(class_id)],
+            }
+            for box, score, class_id in zip(boxes, scores, class_ids)
+        ]
+
+    def detect(self, image_path):
+        """Detect exit signs in an image file"""
+        tensor, meta = self.letterboxer(image_path)
+        output = self.session.run(None, {self.input_name: tensor})[0]
+        return self._decode(output[0], meta)
+
+    def detect_batch(self, frames):
+        """
+        Detect exit signs in already decoded RGB frames
+        Frames are run in chunks of self.batch_size (the tuned or fixed model batch)
+        """
+        results = []
+        batch = np.empty((self.batch_size, 3, *self.input_shape), dtype=np.float32)
+
+        for start in range(0, len(frames), self.batch_size):
+            chunk = frames[start:start + self.batch_size]
+            metas = []
+            for i, frame in enumerate(chunk):
+                tensor, meta = self.letterboxer.letterbox_array(frame)
+                batch[i] = tensor[0]
+                metas.append(meta)
+
+            # Fixed-batch exports need a full batch, dynamic ones take just the chunk
+            inputs = batch if isinstance(self.session.get_inputs()[0].shape[0], int) else batch[:len(chunk)]
+            outputs = self.session.run(None, {self.input_name: inputs})[0]
+            results.extend(self._decode(outputs[i], meta) for i, meta in enumerate(metas))
+
+        return results
+
+    def assess(self, image_path):
+        """Detect exit signs and compute the safety assessment"""
+        detections = self.detect(image_path)
+        assessment = calculate_safety_score(detections, self.config)
+        assessment['detections'] = detections
+        return assessment
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Assess safety from exit signs in photos')
+    parser.add_argument('images', type=str, nargs='+', help='Image files to assess')
+    parser.add_argument('--model', type=str, default='exports/exit_detection_yolov8n.onnx',
+                       help='Exported ONNX model or .bundle')
+    parser.add_argument('--config', type=str, default=None, help='Path to safety_assessment_config.yaml')
+    args = parser.parse_args()
+
+    detector = ExitSignDetector(args.model, args.config)
+    emoji = {'safe': '🟢', 'caution': '🟡', 'unsafe': '🔴'}
+
+    for image_path in args.images:
+        assessment = detector.assess(image_path)
+        counts = assessment['counts']
+        print(f"{emoji[assessment['level']]} {image_path}: {assessment['level']} "
+              f"({assessment['score']:.0%}) lit={counts['lit']} unlit={counts['unlit']} general={counts['general']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+Distributed CPU Training for YOLOv8 Exit Sign Detection
+Data-parallel training over the gloo backend, across local processes and LAN nodes
+
+Single host, 4 processes:
+    python distributed_train.py --data ../YOLO --nproc 4
+
+Two hosts, 4 processes each (run on every node with its own --node-rank):
+    python distributed_train.py --data ../YOLO --nproc 4 --nnodes 2 --node-rank 0 --master-addr 192.168.1.10
+"""
+
+import os
+import math
+import time
+import shutil
+import argparse
+from copy import deepcopy
+from datetime import datetime
+from pathlib import Path
+
+import torch
+import torch.distributed as dist
+import torch.multiprocessing as mp
+from torch.nn.parallel import DistributedDataParallel
+
+from ultralytics import YOLO
+from ultralytics.cfg import get_cfg
+from ultralytics.data import build_dataloader, build_yolo_dataset
+from ultralytics.data.utils import check_det_dataset
+from ultralytics.nn.tasks import DetectionModel, attempt_load_one_weight
+from ultralytics.utils import DEFAULT_CFG
+from ultralytics.utils.torch_utils import torch_distributed_zero_first
+
+
+def _setup_process(local_rank, nproc, nnodes, node_rank, master_addr, master_port):
+    """Join the gloo process group and pin this rank's share of CPU cores"""
+    rank = node_rank * nproc + local_rank
+    world_size = nnodes * nproc
+
+    os.environ['MASTER_ADDR'] = master_addr
+    os.environ['MASTER_PORT'] = str(master_port)
+    dist.init_process_group(backend='gloo', rank=rank, world_size=world_size)
+
+    # Split local cores evenly so ranks don't oversubscribe each other
+    threads = max(1, (os.cpu_count() or 1) // nproc)
+    torch.set_num_threads(threads)
+
+    return rank, world_size, threads
+
+
+def _build_model(model_size, nc, names, cfg, rank, local_rank):
+    """Build a YOLOv8 detection model for nc classes initialised from COCO weights"""
+    # Weights are downloaded per node: local rank 0 fetches them, the node's other ranks read the file
+    with torch_distributed_zero_first(local_rank):
+        pretrained, _ = attempt_load_one_weight(f'yolov8{model_size}.pt')
+
+    model = DetectionModel(f'yolov8{model_size}.yaml', nc=nc, verbose=rank == 0)
+    model.load(pretrained, verbose=rank == 0)
+    model.names = names
+    model.args = cfg  # Loss gains (box/cls/dfl) are read from here
+    return model
+
+
+def _build_optimizer(model, cfg):
+    """SGD with weight decay on conv/linear weights only, matching ultralytics defaults"""
+    decay, no_decay = [], []
+    for module in model.modules():
+        for name, param in module.named_parameters(recurse=False):
+            if name == 'weight' and not isinstance(module, torch.nn.modules.batchnorm._BatchNorm):
+                decay.append(param)
+            else:
+                no_decay.append(param)
+
+    optimizer = torch.optim.SGD(no_decay, lr=cfg.lr0, momentum=cfg.momentum, nesterov=True)
+    optimizer.add_param_group({'params': decay, 'weight_decay': cfg.weight_decay})
+    return optimizer
+
+
+def _save_checkpoint(model, path, epoch, cfg, metrics=None):
+    """Save an ultralytics-compatible checkpoint (rank 0 only)"""
+    torch.save({
+        'epoch': epoch,
+        'model': deepcopy(model).half(),
+        'train_args': vars(cfg),
+        'train_metrics': metrics or {},
+        'date': datetime.now().isoformat(),
+    }, path)
+
+
+def train_worker(local_rank, args, result_queue=None):
+    """Per-process training loop"""
+    rank, world_size, threads = _setup_process(local_rank, args.nproc, args.nnodes, args.node_rank,
+                                      args.master_addr, args.master_port)
+    is_main = rank == 0
+
+    data_yaml = str(Path(args.data) / 'data.yaml')
+    data = check_det_dataset(data_yaml)
+
+    # Global batch is split evenly across ranks
+    local_batch = max(1, args.batch // world_size)
+    cfg = get_cfg(DEFAULT_CFG, {
+        'data': data_yaml,
+        'imgsz': args.imgsz,
+        'batch': local_batch,
+        'epochs': args.epochs,
+        'lr0': 0.01,
+        'momentum': 0.937,
+        'weight_decay': 0.0005,
+        'warmup_epochs': 3,
+        'seed': 42,
+        'workers': args.workers,
+    })
+
+    torch.manual_seed(cfg.seed + rank)
+    model = _build_model(args.model, data['nc'], data['names'], cfg, rank, local_rank)
+    ddp_model = DistributedDataParallel(model, find_unused_parameters=False)
+
+    # DistributedSampler inside build_dataloader gives each rank a disjoint shard
+    # Local rank 0 writes labels.cache first, the other ranks then load it instead of racing to rebuild it
+    with torch_distributed_zero_first(local_rank):
+        dataset = build_yolo_dataset(cfg, data['train'], local_batch, data, mode='train', stride=32)
+    loader = build_dataloader(dataset, local_batch, args.workers, shuffle=True, rank=rank)
+
+    optimizer = _build_optimizer(model, cfg)
+    warmup_iters = max(100, round(cfg.warmup_epochs * len(loader)))
+    lf = lambda x: (1 - x / args.epochs) * (1.0 - cfg.lrf) + cfg.lrf  # Linear LR decay
+
+    save_dir = Path(args.project) / args.name
+    weights_dir = save_dir / 'weights'
+    if is_main:
+        weights_dir.mkdir(parents=True, exist_ok=True)
+        print(f"🌐 Distributed CPU training: {world_size} ranks "
+              f"({args.nnodes} node(s) x {args.nproc} process(es)), "
+              f"{torch.get_num_threads()} threads/rank, batch {local_batch}/rank")
+
+    best_fitness = -1.0
+    images_seen = 0
+    step = 0
+    train_start = time.perf_counter()
+
+    for epoch in range(args.epochs):
+        ddp_model.train()
+        loader.sampler.set_epoch(epoch)
+        epoch_loss = torch.zeros(3)
+        batches = 0
+
+        for batch in loader:
+            if args.max_steps and step >= args.max_steps:
+                break
+
+            # Linear warmup into the per-epoch schedule
+            for j, group in enumerate(optimizer.param_groups):
+                target = cfg.lr0 * lf(epoch)
+                if step < warmup_iters:
+                    start = cfg.warmup_bias_lr if j == 0 else 0.0
+                    group['lr'] = start + (target - start) * step / warmup_iters
+                else:
+                    group['lr'] = target
+
+            batch['img'] = batch['img'].float() / 255
+            loss, loss_items = ddp_model(batch)
+            # Gradients are averaged across ranks, rescale to match single-process magnitude
+            loss = loss.sum() * world_size
+
+            optimizer.zero_grad()
+            loss.backward()  # DDP all-reduces gradients over gloo here
+            torch.nn.utils.clip_grad_norm_(model.parameters(), max_norm=10.0)
+            optimizer.step()
+
+            epoch_loss += loss_items.detach().cpu()
+            batches += 1
+            images_seen += batch['img'].shape[0]
+            step += 1
+
+        # Average the logged losses across ranks
+        dist.all_reduce(epoch_loss, op=dist.ReduceOp.SUM)
+        epoch_loss /= world_size * max(1, batches)
+
+        if is_main:
+            last = weights_dir / 'last.pt'
+            _save_checkpoint(model, last, epoch, cfg)
+            metrics = {}
+            if not args.no_val and (epoch + 1) % args.val_period == 0:
+                results = YOLO(str(last)).val(data=data_yaml, imgsz=args.imgsz, batch=args.batch,
+                                              device='cpu', plots=False, verbose=False)
+                # ultralytics' select_device resets the thread count, restore this rank's share
+                torch.set_num_threads(threads)
+                metrics = {'mAP50': results.box.map50, 'mAP50-95': results.box.map}
+                fitness = 0.1 * results.box.map50 + 0.9 * results.box.map
+                if fitness > best_fitness:
+                    best_fitness = fitness
+                    shutil.copyfile(last, weights_dir / 'best.pt')
+            print(f"📈 Epoch {epoch + 1}/{args.epochs} "
+                  f"box={epoch_loss[0]:.4f} cls={epoch_loss[1]:.4f} dfl={epoch_loss[2]:.4f} "
+                  + ' '.join(f"{k}={v:.4f}" for k, v in metrics.items()))
+
+        # Keep ranks in lockstep while rank 0 writes and validates
+        dist.barrier()
+
+        if args.max_steps and step >= args.max_steps:
+            break
+
+    elapsed = time.perf_counter() - train_start
+    seen = torch.tensor([images_seen], dtype=torch.float64)
+    dist.all_reduce(seen, op=dist.ReduceOp.SUM)
+
+    if is_main:
+        throughput = seen.item() / elapsed
+        print(f"✅ Distributed training completed in {elapsed:.1f}s ({throughput:.1f} images/s)")
+        if args.no_val or not (weights_dir / 'best.pt').exists():
+            shutil.copyfile(weights_dir / 'last.pt', weights_dir / 'best.pt')
+        if result_queue is not None:
+            result_queue.put({'world_size': world_size, 'seconds': elapsed, 'images_per_second': throughput})
+
+    dist.destroy_process_group()
+
+
+def launch(args, result_queue=None):
+    """Spawn this node's local ranks"""
+    mp.spawn(train_worker, args=(args, result_queue), nprocs=args.nproc, join=True)
+
+
+def benchmark_scaling(args):
+    """Measure training throughput from 1 to --nproc local processes"""
+    max_procs = args.nproc
+    counts = sorted({1, max_procs} | {2 ** k for k in range(1, int(math.log2(max_procs)) + 1)})
+    ctx = mp.get_context('spawn')
+
+    print(f"⏱️  Benchmarking CPU data-parallel scaling over {counts} processes "
+          f"({args.max_steps} steps each)")
+
+    report = []
+    for nproc in counts:
+        run_args = argparse.Namespace(**vars(args))
+        run_args.nproc = nproc
+        run_args.nnodes = 1
+        run_args.node_rank = 0
+        run_args.no_val = True
+        run_args.name = f'{args.name}_scaling_{nproc}'
+        queue = ctx.SimpleQueue()
+        launch(run_args, queue)
+        report.append(queue.get())
+
+    baseline = report[0]['images_per_second']
+    print("\n📊 Scaling report")
+    for entry in report:
+        speedup = entry['images_per_second'] / baseline
+        efficiency = speedup / entry['world_size']
+        entry.update({'speedup': speedup, 'efficiency': efficiency})
+        print(f"   {entry['world_size']:>2} procs: {entry['images_per_second']:7.1f} images/s  "
+              f"speedup {speedup:4.2f}x  efficiency {efficiency:.0%}")
+
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Distributed CPU training for YOLOv8 Exit Sign Detection')
+    parser.add_argument('--data', type=str, default='YOLO', help='Path to YOLO dataset')
+    parser.add_argument('--model', type=str, default='n', choices=['n', 's', 'm', 'l', 'x'],
+                       help='YOLOv8 model size')
+    parser.add_argument('--epochs', type=int, default=100, help='Number of training epochs')
+    parser.add_argument('--batch', type=int, default=16, help='Global batch size (split across ranks)')
+    parser.add_argument('--imgsz', type=int, default=640, help='Image size')
+    parser.add_argument('--workers', type=int, default=2, help='Dataloader workers per rank')
+    parser.add_argument('--nproc', type=int, default=2, help='Training processes on this node')
+    parser.add_argument('--nnodes', type=int, default=1, help='Number of nodes')
+    parser.add_argument('--node-rank', type=int, default=0, help='Rank of this node')
+    parser.add_argument('--master-addr', type=str, default='127.0.0.1', help='Address of node 0')
+    parser.add_argument('--master-port', type=int, default=29500, help='Port on node 0')
+    parser.add_argument('--val-period', type=int, default=1, help='Validate every N epochs on rank 0')
+    parser.add_argument('--no-val', action='store_true', help='Skip validation during training')
+    parser.add_argument('--max-steps', type=int, default=0, help='Stop after N optimizer steps (0 = no limit)')
+    parser.add_argument('--benchmark-scaling', action='store_true',
+                       help='Report throughput scaling from 1 to --nproc local processes')
+    parser.add_argument('--project', type=str, default='runs/train', help='Output directory')
+    parser.add_argument('--name', type=str,
+                       default=f'exit_detection_ddp_{datetime.now().strftime("%Y%m%d_%H%M%S")}',
+                       help='Run name')
+
+    args = parser.parse_args()
+
+    if args.benchmark_scaling:
+        if not args.max_steps:
+            args.max_steps = 30
+        benchmark_scaling(args)
+    else:
+        launch(args)
+
+
+if __name__ == '__main__':
+    main()
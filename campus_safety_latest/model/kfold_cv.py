@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Parallel K-Fold Cross-Validation for YOLOv8 Exit Sign Detection
+Builds class-presence-stratified folds from the combined train/valid images,
+trains folds concurrently on CPU and aggregates mAP and per-class AP
+"""
+
+import os
+import json
+import random
+import argparse
+import statistics
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+import multiprocessing as mp
+
+import yaml
+
+
+def _label_path(image_path: Path) -> Path:
+    return Path(str(image_path.parent).replace('images', 'labels')) / f'{image_path.stem}.txt'
+
+
+def class_presence(image_path: Path, nc: int):
+    """Tuple of booleans: which classes appear in the image's label file"""
+    present = [False] * nc
+    label_path = _label_path(image_path)
+    if label_path.exists():
+        for line in label_path.read_text().splitlines():
+            if line.strip():
+                present[int(line.split()[0])] = True
+    return tuple(present)
+
+
+def collect_images(data_path: Path, splits=('train', 'val')):
+    """Combine images from the given data.yaml splits"""
+    with open(data_path / 'data.yaml', 'r') as f:
+        data_config = yaml.safe_load(f)
+
+    images = []
+    for split in splits:
+        split_path = data_path / data_config[split].replace('../', '')
+        images.extend(sorted(list(split_path.glob('*.jpg')) + list(split_path.glob('*.png'))))
+    return [image.resolve() for image in images], data_config
+
+
+def stratified_folds(images, nc: int, k: int, seed: int = 42):
+    """
+    Split images into k folds, stratified by which classes each image contains
+    Images sharing a class-presence signature are dealt round-robin across folds
+    """
+    groups = {}
+    for image in images:
+        groups.setdefault(class_presence(image, nc), []).append(image)
+
+    rng = random.Random(seed)
+    folds = [[] for _ in range(k)]
+    offset = 0
+    # Rarest signatures first so they spread evenly before the common ones fill in
+    for signature in sorted(groups, key=lambda sig: (len(groups[sig]), sig)):
+        members = groups[signature]
+        rng.shuffle(members)
+        for i, image in enumerate(members):
+            folds[(offset + i) % k].append(image)
+        offset += len(members)
+    return folds
+
+
+def link_fold_split(split_dir: Path, images):
+    """
+    Symlink images, labels and their .npy disk cache into a fold-private split directory
+    ultralytics writes labels.cache next to the first label's directory, so folds sharing
+    YOLO/train/labels would keep overwriting each other's cache while training in parallel
+    """
+    split_dir = split_dir.resolve()
+    images_dir, labels_dir = split_dir / 'images', split_dir / 'labels'
+    images_dir.mkdir(parents=True, exist_ok=True)
+    labels_dir.mkdir(parents=True, exist_ok=True)
+
+    linked = []
+    for image in images:
+        # Prefix with the source split so train/valid images with the same name don't collide
+        name = f'{image.parent.parent.name}_{image.name}'
+        links = {
+            images_dir / name: image,
+            images_dir / Path(name).with_suffix('.npy'): image.with_suffix('.npy'),  # Filled by warm_image_cache
+        }
+        label_path = _label_path(image)
+        if label_path.exists():
+            links[labels_dir / f'{Path(name).stem}.txt'] = label_path
+        for link, target in links.items():
+            if not link.is_symlink():
+                link.symlink_to(target)
+        linked.append(images_dir / name)
+    return linked
+
+
+def warm_image_cache(images):
+    """
+    Decode every image once into ultralytics' on-disk .npy cache (same format as cache='disk')
+    All folds then load the decoded arrays instead of re-decoding JPEGs. The .npy files are
+    written directly rather than through a dataset, which would rewrite YOLO/train/labels.cache
+    """
+    import cv2
+    import numpy as np
+
+    for image in images:
+        npy_path = image.with_suffix('.npy')
+        if not npy_path.exists():
+            np.save(npy_path, cv2.imread(str(image)), allow_pickle=False)
+
+
+def _init_fold_worker(threads: int):
+    """Bound each fold's intra-op threads so concurrent folds don't oversubscribe cores"""
+    for var in ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS'):
+        os.environ[var] = str(threads)
+    import torch
+    torch.set_num_threads(threads)
+
+
+def train_fold(fold, fold_yaml, model_size, epochs, imgsz, batch, project, threads):
+    """Train and validate a single fold (runs in a worker process)"""
+    import torch
+    from ultralytics import YOLO
+
+    # ultralytics' select_device resets CPU threads to min(8, cores - 1) when a trainer or
+    # validator starts, so re-apply this fold's budget once the device has been selected
+    observed = []
+
+    def pin_threads(_):
+        torch.set_num_threads(threads)
+        observed.append(torch.get_num_threads())
+
+    model = YOLO(f'yolov8{model_size}.pt')
+    model.add_callback('on_train_start', pin_threads)
+    model.add_callback('on_val_start', pin_threads)
+    model.train(
+        data=str(fold_yaml),
+        epochs=epochs,
+        imgsz=imgsz,
+        batch=batch,
+        device='cpu',
+        cache='disk',  # Reuse the shared decoded image cache
+        workers=0,     # Threads are budgeted per fold, keep loading in-process
+        seed=42,
+        deterministic=True,
+        project=project,
+        name=f'fold_{fold}',
+        exist_ok=True,
+        plots=False,
+        verbose=False,
+    )
+    metrics = model.val(data=str(fold_yaml), imgsz=imgsz, batch=batch, device='cpu',
+                        plots=False, verbose=False)
+
+    per_class = {}
+    for i, class_index in enumerate(metrics.box.ap_class_index):
+        per_class[model.names[int(class_index)]] = float(metrics.box.ap[i])
+
+    return {
+        'fold': fold,
+        'mAP50': float(metrics.box.map50),
+        'mAP50-95': float(metrics.box.map),
+        'per_class_ap': per_class,
+        'threads': max(observed, default=torch.get_num_threads()),
+    }
+
+
+def _mean_std(values):
+    if not values:
+        return None, None
+    return statistics.mean(values), statistics.stdev(values) if len(values) > 1 else 0.0
+
+
+def run_kfold(data_path, k: int = 5, model_size: str = 'n', epochs: int = 50, imgsz: int = 640,
+              batch: int = 8, parallel: int = None, threads_per_fold: int = None, seed: int = 42):
+    """
+    Run k-fold cross-validation
+    Args:
+        data_path: Path to the YOLO dataset
+        k: Number of folds
+        parallel: Folds trained at once (defaults to as many as fit the cores at 2+ threads each)
+        threads_per_fold: Intra-op threads per fold (defaults to cores // parallel)
+    Returns:
+        Dict with per-fold results and mean/stddev aggregates
+    """
+    data_path = Path(data_path)
+    cores = os.cpu_count() or 1
+    parallel = parallel or max(1, min(k, cores // 2))
+    threads_per_fold = threads_per_fold or max(1, cores // parallel)
+
+    images, data_config = collect_images(data_path)
+    nc = data_config['nc']
+    names = data_config['names']
+    folds = stratified_folds(images, nc, k, seed=seed)
+
+    run_dir = Path('runs/kfold') / datetime.now().strftime('%Y%m%d_%H%M%S')
+    run_dir.mkdir(parents=True, exist_ok=True)
+    print(f"🧪 {k}-fold cross-validation on {len(images)} images "
+          f"({parallel} folds at a time, {threads_per_fold} threads each)")
+
+    fold_yamls = []
+    for i, val_images in enumerate(folds):
+        fold_dir = run_dir / f'fold_{i}'
+        fold_dir.mkdir(parents=True, exist_ok=True)
+        train_images = [image for j, fold in enumerate(folds) if j != i for image in fold]
+        train_links = link_fold_split(fold_dir / 'train', train_images)
+        val_links = link_fold_split(fold_dir / 'val', val_images)
+        (fold_dir / 'train.txt').write_text(''.join(f'{image}\n' for image in train_links))
+        (fold_dir / 'val.txt').write_text(''.join(f'{image}\n' for image in val_links))
+
+        fold_yaml = fold_dir / 'data.yaml'
+        with open(fold_yaml, 'w') as f:
+            yaml.dump({
+                'train': str((fold_dir / 'train.txt').resolve()),
+                'val': str((fold_dir / 'val.txt').resolve()),
+                'nc': nc,
+                'names': names,
+            }, f, default_flow_style=False)
+        fold_yamls.append(fold_yaml)
+        print(f"📁 Fold {i}: {len(train_images)} train / {len(val_images)} val")
+
+    print("🗃️  Decoding images into the shared cache...")
+    warm_image_cache(images)
+
+    results = []
+    ctx = mp.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=parallel, mp_context=ctx,
+                             initializer=_init_fold_worker, initargs=(threads_per_fold,)) as pool:
+        futures = [
+            pool.submit(train_fold, i, fold_yaml, model_size, epochs, imgsz, batch, str(run_dir.resolve()),
+                        threads_per_fold)
+            for i, fold_yaml in enumerate(fold_yamls)
+        ]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            print(f"✅ Fold {result['fold']}: mAP50 {result['mAP50']:.4f}, mAP50-95 {result['mAP50-95']:.4f} "
+                  f"({result['threads']} threads)")
+
+    results.sort(key=lambda r: r['fold'])
+    summary = {'k': k, 'folds': results, 'mean': {}, 'std': {}}
+    for metric in ('mAP50', 'mAP50-95'):
+        summary['mean'][metric], summary['std'][metric] = _mean_std([r[metric] for r in results])
+    for class_name in names:
+        values = [r['per_class_ap'][class_name] for r in results if class_name in r['per_class_ap']]
+        mean, std = _mean_std(values)
+        if mean is not None:
+            summary['mean'][f'{class_name} AP'] = mean
+            summary['std'][f'{class_name} AP'] = std
+
+    print(f"\n📊 {k}-fold summary")
+    for metric, mean in summary['mean'].items():
+        print(f"   {metric:<22} {mean:.4f} ± {summary['std'][metric]:.4f}")
+
+    with open(run_dir / 'kfold_results.json', 'w') as f:
+        json.dump(summary, f, indent=2)
+    print(f"📋 Results saved: {run_dir / 'kfold_results.json'}")
+
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Parallel k-fold cross-validation for exit sign detection')
+    parser.add_argument('--data', type=str, default='YOLO', help='Path to YOLO dataset')
+    parser.add_argument('--model', type=str, default='n', choices=['n', 's', 'm', 'l', 'x'],
+                       help='YOLOv8 model size')
+    parser.add_argument('--folds', type=int, default=5, help='Number of folds')
+    parser.add_argument('--epochs', type=int, default=50, help='Training epochs per fold')
+    parser.add_argument('--batch', type=int, default=8, help='Batch size per fold')
+    parser.add_argument('--imgsz', type=int, default=640, help='Image size')
+    parser.add_argument('--parallel', type=int, default=None, help='Folds trained concurrently')
+    parser.add_argument('--threads-per-fold', type=int, default=None, help='CPU threads per fold')
+    args = parser.parse_args()
+
+    run_kfold(args.data, k=args.folds, model_size=args.model, epochs=args.epochs, imgsz=args.imgsz,
+              batch=args.batch, parallel=args.parallel, threads_per_fold=args.threads_per_fold)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Versioned Model Bundle
+Packs exported models, labels, thresholds and checksums into a single file
+that is memory-mapped on load, so only the sections a runtime uses are read
+
+Layout:
+    [prefix]   magic (8) | format version (uint32) | header length (uint32) | header sha256 (32)
+    [header]   UTF-8 JSON metadata, padded to a page boundary
+    [models]   raw model bytes, each section starting on a page boundary
+"""
+
+import hashlib
+import json
+import mmap
+import struct
+from datetime import datetime
+from pathlib import Path
+
+BUNDLE_MAGIC = b'CSMBNDL\x00'
+BUNDLE_FORMAT_VERSION = 1
+PAGE_SIZE = 4096
+
+_PREFIX = struct.Struct('<8sII32s')
+
+
+def _align(offset: int, alignment: int = PAGE_SIZE) -> int:
+    return (offset + alignment - 1) // alignment * alignment
+
+
+def write_bundle(bundle_path, models, metadata):
+    """
+    Write a model bundle
+    Args:
+        bundle_path: Output path for the bundle
+        models: Dict mapping section name (e.g. 'tflite', 'onnx') to a model file path
+        metadata: Dict with labels, thresholds, input shape, version, ...
+    Returns:
+        Path to the written bundle
+    """
+    bundle_path = Path(bundle_path)
+    if not models:
+        raise ValueError("Cannot create a bundle without any models")
+
+    payloads = {}
+    for name, model_path in models.items():
+        with open(model_path, 'rb') as f:
+            payloads[name] = f.read()
+
+    # Header size depends on the offsets it records, so lay out until stable
+    header_size = PAGE_SIZE
+    while True:
+        offset = _align(_PREFIX.size + header_size)
+        sections = {}
+        for name, data in payloads.items():
+            sections[name] = {
+                'file': Path(models[name]).name,
+                'offset': offset,
+                'size': len(data),
+                'sha256': hashlib.sha256(data).hexdigest(),
+            }
+            offset = _align(offset + len(data))
+
+        header = dict(metadata)
+        header['bundle_format_version'] = BUNDLE_FORMAT_VERSION
+        header.setdefault('created', datetime.now().isoformat(timespec='seconds'))
+        header['models'] = sections
+        header_bytes = json.dumps(header, indent=2, sort_keys=True).encode('utf-8')
+
+        if len(header_bytes) <= header_size:
+            break
+        header_size = _align(len(header_bytes))
+
+    with open(bundle_path, 'wb') as f:
+        f.write(_PREFIX.pack(BUNDLE_MAGIC, BUNDLE_FORMAT_VERSION, len(header_bytes),
+                             hashlib.sha256(header_bytes).digest()))
+        f.write(header_bytes)
+        for name, data in payloads.items():
+            f.write(b'\x00' * (sections[name]['offset'] - f.tell()))
+            f.write(data)
+
+    return bundle_path
+
+
+class ModelBundle:
+    """Read-only, memory-mapped view of a model bundle"""
+
+    def __init__(self, bundle_path, verify: bool = False):
+        """
+        Open a bundle
+        Args:
+            bundle_path: Path to the .bundle file
+            verify: Check model checksums (reads and hashes every model section)
+        """
+        self.path = Path(bundle_path)
+        self._file = open(self.path, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            magic, version, header_length, header_digest = _PREFIX.unpack_from(self._mmap, 0)
+            if magic != BUNDLE_MAGIC:
+                raise ValueError(f"Not a model bundle: {self.path}")
+            if version > BUNDLE_FORMAT_VERSION:
+                raise ValueError(f"Unsupported bundle format version {version}")
+
+            header_bytes = self._mmap[_PREFIX.size:_PREFIX.size + header_length]
+            if hashlib.sha256(header_bytes).digest() != header_digest:
+                raise ValueError(f"Bundle header checksum mismatch: {self.path}")
+            self.metadata = json.loads(header_bytes.decode('utf-8'))
+
+            if verify:
+                self.verify()
+        except Exception:
+            self.close()
+            raise
+
+    @property
+    def models(self):
+        return self.metadata['models']
+
+    @property
+    def labels(self):
+        return self.metadata.get('labels', [])
+
+    @property
+    def thresholds(self):
+        return self.metadata.get('thresholds', {})
+
+    @property
+    def input_shape(self):
+        return self.metadata.get('input_shape')
+
+    def model_buffer(self, name: str = None) -> memoryview:
+        """Return a zero-copy view of a model section (defaults to the first one)"""
+        if name is None:
+            name = next(iter(self.models))
+        if name not in self.models:
+            raise KeyError(f"Model '{name}' not in bundle (available: {list(self.models)})")
+
+        section = self.models[name]
+        view = memoryview(self._mmap)
+        return view[section['offset']:section['offset'] + section['size']]
+
+    def verify(self):
+        """Check every model section against its recorded sha256"""
+        for name, section in self.models.items():
+            digest = hashlib.sha256(self.model_buffer(name)).hexdigest()
+            if digest != section['sha256']:
+                raise ValueError(f"Checksum mismatch for model '{name}' in {self.path}")
+
+    def model_bytes(self, name: str = None) -> bytes:
+        """
+        Copy a model section out of the mapping
+        The onnxruntime and TFLite Python bindings only accept bytes, so each
+        runtime instance holds its own copy of the model
+        """
+        return self.model_buffer(name).tobytes()
+
+    def runtime_profile(self, name: str):
+        """Tuned runtime settings for this host saved next to the bundle (or None)"""
+        from runtime_tuner import load_runtime_profile
+        return load_runtime_profile(self.path, digest=self.models[name]['sha256'])
+
+    def create_tflite_interpreter(self, name: str = 'tflite', **kwargs):
+        """Create a TFLite interpreter from the mapped bundle"""
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            from tensorflow.lite import Interpreter
+
+        if not kwargs:
+            from runtime_tuner import tflite_interpreter_kwargs
+            kwargs = tflite_interpreter_kwargs(self.runtime_profile(name))
+
+        return Interpreter(model_content=self.model_bytes(name), **kwargs)
+
+    def create_onnx_session(self, name: str = 'onnx', **kwargs):
+        """Create an ONNX Runtime session from the mapped bundle"""
+        import onnxruntime as ort
+
+        if kwargs.get('sess_options') is None:
+            from runtime_tuner import onnx_session_options
+            kwargs['sess_options'] = onnx_session_options(self.runtime_profile(name))
+
+        return ort.InferenceSession(self.model_bytes(name), **kwargs)
+
+    def close(self):
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                # A runtime still holds a view into the mapping; leave it to the GC
+                pass
+            self._mmap = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def load_bundle(bundle_path, verify: bool = False) -> ModelBundle:
+    """Memory-map a model bundle"""
+    return ModelBundle(bundle_path, verify=verify)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Inspect a model bundle')
+    parser.add_argument('bundle', type=str, help='Path to the .bundle file')
+    parser.add_argument('--no-verify', action='store_true', help='Skip checksum verification')
+    args = parser.parse_args()
+
+    with load_bundle(args.bundle, verify=not args.no_verify) as bundle:
+        print(f"📦 Bundle: {bundle.path}")
+        print(f"🏷️  Version: {bundle.metadata.get('version')}")
+        print(f"🏷️  Labels: {bundle.labels}")
+        print(f"🖼️  Input shape: {bundle.input_shape}")
+        print(f"🎯 Thresholds: {bundle.thresholds}")
+        for name, section in bundle.models.items():
+            print(f"🤖 {name}: {section['size']:,} bytes @ {section['offset']} ({section['sha256'][:12]}...)")
+        if not args.no_verify:
+            print("✅ Checksums verified")
+
+
+if __name__ == '__main__':
+    main()
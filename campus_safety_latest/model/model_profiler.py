@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Per-Operator Profiling for Exported Models
+Aggregates ONNX Runtime (and TFLite, where available) op timings per operator
+type and per YOLOv8 layer, and keeps a Chrome trace for chrome://tracing / Perfetto
+"""
+
+import re
+import json
+import shutil
+import subprocess
+import time
+import argparse
+from collections import defaultdict
+from pathlib import Path
+
+import numpy as np
+
+# ultralytics names ONNX nodes after the module path, e.g. /model.22/cv2.0/cv2.0.0/conv/Conv
+_LAYER_PATTERN = re.compile(r'^/?model\.(\d+)(/.*)?$')
+
+
+def layer_index(node_name: str):
+    """Return the YOLOv8 layer index encoded in an exported node name (or None)"""
+    match = _LAYER_PATTERN.match(node_name)
+    return int(match.group(1)) if match else None
+
+
+def yolo_layer_names(model):
+    """Map layer index -> 'idx ModuleType' for an ultralytics YOLO model"""
+    return {i: f"{i} {type(m).__name__}" for i, m in enumerate(model.model.model)}
+
+
+def profile_onnx(onnx_path, runs: int = 100, warmup: int = 10, output_dir=None, layer_names=None):
+    """
+    Profile an ONNX model with onnxruntime's built-in profiler
+    Args:
+        onnx_path: Path to the exported .onnx model
+        runs: Number of profiled inference runs
+        warmup: Leading runs excluded from the aggregates (still present in the trace)
+        output_dir: Where to write the Chrome trace (defaults to the model directory)
+        layer_names: Optional {layer index: name} map from yolo_layer_names()
+    Returns:
+        Dict with per-op-type and per-layer aggregates and the trace path
+    """
+    import onnxruntime as ort
+
+    onnx_path = Path(onnx_path)
+    output_dir = Path(output_dir or onnx_path.parent)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    options = ort.SessionOptions()
+    options.enable_profiling = True
+    options.profile_file_prefix = str(output_dir / f'{onnx_path.stem}_ort_profile')
+    session = ort.InferenceSession(str(onnx_path), options, providers=['CPUExecutionProvider'])
+
+    model_input = session.get_inputs()[0]
+    shape = [dim if isinstance(dim, int) else 1 for dim in model_input.shape]
+    dummy = np.random.rand(*shape).astype(np.float32)
+
+    for _ in range(warmup + runs):
+        session.run(None, {model_input.name: dummy})
+
+    trace_path = Path(session.end_profiling())
+    final_trace = output_dir / f'{onnx_path.stem}_trace.json'
+    shutil.move(str(trace_path), final_trace)
+
+    with open(final_trace, 'r') as f:
+        events = json.load(f)
+
+    # Kernel events carry the op type; skip the warmup runs
+    run_starts = sorted(e['ts'] for e in events if e.get('cat') == 'Session' and e.get('name') == 'model_run')
+    cutoff = run_starts[warmup] if len(run_starts) > warmup else 0
+
+    by_op = defaultdict(float)
+    by_layer = defaultdict(float)
+    by_node = defaultdict(float)
+    node_ops = {}
+    layer_names = layer_names or {}
+
+    for event in events:
+        if event.get('cat') != 'Node' or not event.get('name', '').endswith('_kernel_time'):
+            continue
+        if event['ts'] < cutoff:
+            continue
+
+        node_name = event['name'][:-len('_kernel_time')]
+        op_type = event.get('args', {}).get('op_name', 'Unknown')
+        duration_us = event['dur']
+
+        by_op[op_type] += duration_us
+        by_node[node_name] += duration_us
+        node_ops[node_name] = op_type
+
+        index = layer_index(node_name)
+        layer = layer_names.get(index, f'{index}') if index is not None else 'other'
+        by_layer[layer] += duration_us
+
+    return {
+        'runtime': 'onnxruntime',
+        'model': str(onnx_path),
+        'runs': runs,
+        'by_op_type': _per_run(by_op, runs),
+        'by_layer': _per_run(by_layer, runs),
+        'by_node': _per_run(by_node, runs),
+        'node_ops': node_ops,
+        'trace': str(final_trace),
+    }
+
+
+def profile_tflite(tflite_path, runs: int = 100, warmup: int = 10, threads: int = 4):
+    """
+    Profile a TFLite model
+    Uses the TFLite benchmark_model tool for op-level timing when it is on PATH,
+    otherwise reports end-to-end invoke latency only
+    """
+    tflite_path = Path(tflite_path)
+    benchmark_tool = shutil.which('benchmark_model')
+
+    if benchmark_tool:
+        completed = subprocess.run([
+            benchmark_tool,
+            f'--graph={tflite_path}',
+            f'--num_runs={runs}',
+            f'--warmup_runs={warmup}',
+            f'--num_threads={threads}',
+            '--enable_op_profiling=true',
+        ], capture_output=True, text=True, check=True)
+        by_op, by_node = _parse_tflite_op_profile(completed.stdout + completed.stderr)
+        return {
+            'runtime': 'tflite (benchmark_model)',
+            'model': str(tflite_path),
+            'runs': runs,
+            'by_op_type': by_op,
+            'by_node': by_node,
+        }
+
+    try:
+        from tflite_runtime.interpreter import Interpreter
+    except ImportError:
+        from tensorflow.lite import Interpreter
+
+    interpreter = Interpreter(model_path=str(tflite_path), num_threads=threads)
+    interpreter.allocate_tensors()
+    input_detail = interpreter.get_input_details()[0]
+    dummy = np.random.rand(*input_detail['shape']).astype(input_detail['dtype'])
+
+    for _ in range(warmup):
+        interpreter.set_tensor(input_detail['index'], dummy)
+        interpreter.invoke()
+
+    start = time.perf_counter()
+    for _ in range(runs):
+        interpreter.set_tensor(input_detail['index'], dummy)
+        interpreter.invoke()
+    latency_us = 1e6 * (time.perf_counter() - start) / runs
+
+    return {
+        'runtime': 'tflite (end-to-end only, benchmark_model not found)',
+        'model': str(tflite_path),
+        'runs': runs,
+        'by_op_type': {'Invoke': latency_us},
+        'by_node': {},
+    }
+
+
+def _parse_tflite_op_profile(output: str):
+    """Parse the 'Operator-wise Profiling Info' tables printed by benchmark_model"""
+    by_op, by_node = {}, {}
+    section = None
+
+    for line in output.splitlines():
+        if 'Top by Computation Time' in line or 'Run Order' in line:
+            section = 'node'
+            continue
+        if 'Summary by node type' in line:
+            section = 'op'
+            continue
+        columns = [c.strip() for c in line.split('\t') if c.strip()]
+        if section is None or len(columns) < 4 or columns[0].startswith('['):
+            continue
+
+        try:
+            if section == 'op':
+                # [Node type] [count] [avg ms] [avg %] ...
+                by_op[columns[0]] = float(columns[2]) * 1000
+            else:
+                # [node type] [first] [avg ms] [%] [cdf%] [mem KB] [times called] [Name]
+                by_node[columns[-1]] = float(columns[2]) * 1000
+        except ValueError:
+            continue
+
+    return by_op, by_node
+
+
+def _per_run(totals, runs):
+    return {name: total / runs for name, total in totals.items()}
+
+
+def format_report(profile, top: int = 20):
+    """Render a sorted plain-text report (times are per inference run)"""
+    lines = [f"# {profile['runtime']} profile: {profile['model']} ({profile['runs']} runs)", '']
+
+    sections = [('Operator type', profile.get('by_op_type', {})),
+                ('YOLOv8 layer', profile.get('by_layer', {})),
+                ('Node', profile.get('by_node', {}))]
+
+    for title, timings in sections:
+        if not timings:
+            continue
+        total = sum(timings.values()) or 1.0
+        lines.append(f"## By {title.lower()}")
+        lines.append(f"{title:<48} {'avg ms':>9} {'share':>7}")
+        for name, duration_us in sorted(timings.items(), key=lambda item: item[1], reverse=True)[:top]:
+            if title == 'Node' and name in profile.get('node_ops', {}):
+                name = f"{name} [{profile['node_ops'][name]}]"
+            lines.append(f"{name[:48]:<48} {duration_us / 1000:9.3f} {duration_us / total:7.1%}")
+        lines.append('')
+
+    if profile.get('trace'):
+        lines.append(f"Trace: {profile['trace']} (open in chrome://tracing or ui.perfetto.dev)")
+
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Per-operator profiling for exported models')
+    parser.add_argument('model', type=str, help='Path to an exported .onnx or .tflite model')
+    parser.add_argument('--weights', type=str, default=None,
+                       help='YOLOv8 .pt weights used to name layers in the report')
+    parser.add_argument('--runs', type=int, default=100, help='Profiled inference runs')
+    parser.add_argument('--top', type=int, default=20, help='Rows per report section')
+    args = parser.parse_args()
+
+    model_path = Path(args.model)
+    if model_path.suffix == '.onnx':
+        layer_names = {}
+        if args.weights:
+            from ultralytics import YOLO
+            layer_names = yolo_layer_names(YOLO(args.weights))
+        profile = profile_onnx(model_path, runs=args.runs, layer_names=layer_names)
+    elif model_path.suffix == '.tflite':
+        profile = profile_tflite(model_path, runs=args.runs)
+    else:
+        parser.error('Model must be an .onnx or .tflite file')
+
+    report = format_report(profile, top=args.top)
+    report_path = model_path.parent / f'{model_path.stem}_profile.txt'
+    with open(report_path, 'w') as f:
+        f.write(report)
+
+    print(report)
+    print(f"\n📋 Profile report saved: {report_path}")
+
+
+if __name__ == '__main__':
+    main()
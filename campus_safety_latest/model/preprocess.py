@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Fast Image Preprocessing for Python Inference
+Reduced-resolution JPEG decoding (DCT-domain draft mode), EXIF orientation and
+single-pass letterboxing into reused buffers
+"""
+
+import math
+import time
+import argparse
+import tempfile
+from pathlib import Path
+
+import numpy as np
+from PIL import Image, ImageOps
+
+PAD_VALUE = 114  # Same gray padding as ultralytics LetterBox
+
+# EXIF orientations that swap width and height
+_TRANSPOSED_ORIENTATIONS = {5, 6, 7, 8}
+
+
+class Letterboxer:
+    """
+    Decode and letterbox images into a fixed model input
+    The output tensor is reused between calls, so copy it if you need to keep it
+    """
+
+    def __init__(self, input_shape=(640, 640), channels_first: bool = True):
+        """
+        Args:
+            input_shape: (height, width) of the model input
+            channels_first: Produce NCHW (ONNX) instead of NHWC (TFLite) tensors
+        """
+        self.input_height, self.input_width = input_shape
+        self.channels_first = channels_first
+
+        self._canvas = np.full((self.input_height, self.input_width, 3), PAD_VALUE, dtype=np.uint8)
+        if channels_first:
+            self._tensor = np.empty((1, 3, self.input_height, self.input_width), dtype=np.float32)
+        else:
+            self._tensor = np.empty((1, self.input_height, self.input_width, 3), dtype=np.float32)
+        self._last_region = None
+
+    def load(self, image_path):
+        """
+        Decode an image at the smallest resolution that still covers the model input
+        Returns:
+            Upright RGB PIL image and the original (width, height) after EXIF rotation
+        """
+        image = Image.open(image_path)
+        orientation = image.getexif().get(0x0112, 1)
+
+        stored_width, stored_height = image.size
+        if orientation in _TRANSPOSED_ORIENTATIONS:
+            original_size = (stored_height, stored_width)
+        else:
+            original_size = (stored_width, stored_height)
+
+        # Letterbox scale in upright coordinates, mapped back to the stored orientation
+        scale = min(self.input_width / original_size[0], self.input_height / original_size[1])
+        needed = (math.ceil(original_size[0] * scale), math.ceil(original_size[1] * scale))
+        if orientation in _TRANSPOSED_ORIENTATIONS:
+            needed = (needed[1], needed[0])
+
+        # JPEG only: decode at 1/2, 1/4 or 1/8 scale directly from the DCT coefficients
+        image.draft('RGB', needed)
+        image = ImageOps.exif_transpose(image)
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+
+        return image, original_size
+
+    def letterbox(self, image: Image.Image, original_size=None):
+        """
+        Resize an upright RGB image into the reused canvas and normalize it
+        Returns:
+            (tensor, meta) where meta holds the scale and padding to map boxes back
+        """
+        original_size = original_size or image.size
+        scale = min(self.input_width / original_size[0], self.input_height / original_size[1])
+        new_width = round(original_size[0] * scale)
+        new_height = round(original_size[1] * scale)
+        pad_x = (self.input_width - new_width) // 2
+        pad_y = (self.input_height - new_height) // 2
+
+        if image.size != (new_width, new_height):
+            image = image.resize((new_width, new_height), Image.BILINEAR)
+
+        # Only re-pad when the content region changes (e.g. landscape after portrait)
+        region = (pad_x, pad_y, new_width, new_height)
+        if region != self._last_region:
+            self._canvas.fill(PAD_VALUE)
+            self._last_region = region
+        self._canvas[pad_y:pad_y + new_height, pad_x:pad_x + new_width] = np.asarray(image)
+
+        if self.channels_first:
+            np.multiply(self._canvas.transpose(2, 0, 1), np.float32(1 / 255.0), out=self._tensor[0], casting='unsafe')
+        else:
+            np.multiply(self._canvas, np.float32(1 / 255.0), out=self._tensor[0], casting='unsafe')
+
+        meta = {
+            'scale': scale,
+            'pad': (pad_x, pad_y),
+            'original_size': original_size,
+        }
+        return self._tensor, meta
+
+    def __call__(self, image_path):
+        """Decode + letterbox a file in one go"""
+        image, original_size = self.load(image_path)
+        return self.letterbox(image, original_size)
+
+    def letterbox_array(self, frame: np.ndarray):
+        """Letterbox an already decoded RGB frame (e.g. from a video stream)"""
+        return self.letterbox(Image.fromarray(frame))
+
+
+def scale_boxes(boxes, meta):
+    """Map xywh boxes from model input coordinates back to the original image"""
+    boxes = np.asarray(boxes, dtype=np.float32).copy()
+    pad_x, pad_y = meta['pad']
+    boxes[..., 0] = (boxes[..., 0] - pad_x) / meta['scale']
+    boxes[..., 1] = (boxes[..., 1] - pad_y) / meta['scale']
+    boxes[..., 2:4] /= meta['scale']
+    return boxes
+
+
+def naive_preprocess(image_path, input_shape=(640, 640)):
+    """Reference path: full-resolution decode, then resize into a fresh buffer"""
+    input_height, input_width = input_shape
+    image = ImageOps.exif_transpose(Image.open(image_path)).convert('RGB')
+
+    scale = min(input_width / image.width, input_height / image.height)
+    new_width, new_height = round(image.width * scale), round(image.height * scale)
+    resized = np.asarray(image.resize((new_width, new_height), Image.BILINEAR))
+
+    canvas = np.full((input_height, input_width, 3), PAD_VALUE, dtype=np.uint8)
+    pad_x, pad_y = (input_width - new_width) // 2, (input_height - new_height) // 2
+    canvas[pad_y:pad_y + new_height, pad_x:pad_x + new_width] = resized
+    return (canvas.transpose(2, 0, 1)[None].astype(np.float32) / 255.0)
+
+
+def make_phone_images(source_dir, output_dir, size=(3024, 4032), quality: int = 90):
+    """Upscale dataset images to phone-camera resolution JPEGs for benchmarking"""
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for source in sorted(Path(source_dir).glob('*.jpg')) + sorted(Path(source_dir).glob('*.png')):
+        target = output_dir / f'{source.stem}_phone.jpg'
+        Image.open(source).convert('RGB').resize(size, Image.BICUBIC).save(target, quality=quality)
+        paths.append(target)
+    return paths
+
+
+def benchmark(image_paths, input_shape=(640, 640), rounds: int = 5):
+    """Compare decode+preprocess throughput of the naive and fast paths"""
+    letterboxer = Letterboxer(input_shape)
+    results = {}
+
+    for name, preprocess in [('naive', lambda p: naive_preprocess(p, input_shape)),
+                             ('fast', letterboxer)]:
+        preprocess(image_paths[0])  # Warm up file cache and codecs
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for path in image_paths:
+                preprocess(path)
+        elapsed = time.perf_counter() - start
+        results[name] = len(image_paths) * rounds / elapsed
+
+    results['speedup'] = results['fast'] / results['naive']
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark fast JPEG decode + letterbox preprocessing')
+    parser.add_argument('--images', type=str, default='../YOLO/test/images', help='Source images')
+    parser.add_argument('--phone-size', type=int, nargs=2, default=[3024, 4032],
+                       help='Width and height to upscale source images to')
+    parser.add_argument('--imgsz', type=int, nargs='+', default=[640],
+                       help='Model input size, or HEIGHT WIDTH')
+    parser.add_argument('--rounds', type=int, default=5, help='Passes over the image set')
+    args = parser.parse_args()
+
+    input_shape = (args.imgsz[0], args.imgsz[0]) if len(args.imgsz) == 1 else tuple(args.imgsz)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"📷 Upscaling {args.images} to {args.phone_size[0]}x{args.phone_size[1]}...")
+        paths = make_phone_images(args.images, tmp, size=tuple(args.phone_size))
+        if not paths:
+            raise FileNotFoundError(f"No images found in {args.images}")
+
+        print(f"⏱️  Benchmarking {len(paths)} images x {args.rounds} rounds...")
+        results = benchmark(paths, input_shape, rounds=args.rounds)
+
+    print(f"📊 Naive decode + resize: {results['naive']:.1f} images/s")
+    print(f"📊 Draft decode + letterbox: {results['fast']:.1f} images/s")
+    print(f"🚀 Speedup: {results['speedup']:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
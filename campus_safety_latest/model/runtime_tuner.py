@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Runtime Session Auto-Tuner
+Searches onnxruntime / TFLite settings on this host for the best throughput under
+a latency cap and persists the winner as a per-host runtime profile
+"""
+
+import os
+import json
+import time
+import socket
+import hashlib
+import argparse
+import itertools
+from pathlib import Path
+
+import numpy as np
+
+PROFILE_FILENAME = 'runtime_profile.json'
+
+_GRAPH_LEVELS = ['basic', 'extended', 'all']
+_EXECUTION_MODES = ['sequential', 'parallel']
+
+
+def _model_key(model_path: Path, digest: str = None):
+    """Profiles are keyed by host and model contents, so re-exported models get re-tuned"""
+    digest = digest or hashlib.sha256(Path(model_path).read_bytes()).hexdigest()
+    return f"{socket.gethostname()}:{digest[:16]}"
+
+
+def profile_path_for(model_path):
+    """Runtime profiles live next to the exported model"""
+    return Path(model_path).parent / PROFILE_FILENAME
+
+
+def load_runtime_profile(model_path, digest: str = None):
+    """
+    Return the tuned settings for this host and model, or None
+    Args:
+        model_path: Model file (or bundle) whose directory holds the profile
+        digest: sha256 of the model bytes, if already known (e.g. from a bundle header)
+    """
+    profile_path = profile_path_for(model_path)
+    if not profile_path.exists():
+        return None
+    with open(profile_path, 'r') as f:
+        profiles = json.load(f)
+    return profiles.get(_model_key(model_path, digest))
+
+
+def save_runtime_profile(model_path, settings):
+    """Merge this host's tuned settings into the shared profile file"""
+    profile_path = profile_path_for(model_path)
+    profiles = {}
+    if profile_path.exists():
+        with open(profile_path, 'r') as f:
+            profiles = json.load(f)
+    profiles[_model_key(model_path)] = settings
+    with open(profile_path, 'w') as f:
+        json.dump(profiles, f, indent=2, sort_keys=True)
+    return profile_path
+
+
+def onnx_session_options(settings=None):
+    """Build onnxruntime.SessionOptions from a tuned profile (defaults if None)"""
+    import onnxruntime as ort
+
+    options = ort.SessionOptions()
+    if not settings:
+        return options
+
+    options.intra_op_num_threads = settings['intra_op_threads']
+    options.inter_op_num_threads = settings['inter_op_threads']
+    options.graph_optimization_level = {
+        'basic': ort.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+        'extended': ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+        'all': ort.GraphOptimizationLevel.ORT_ENABLE_ALL,
+    }[settings['graph_optimization']]
+    options.execution_mode = {
+        'sequential': ort.ExecutionMode.ORT_SEQUENTIAL,
+        'parallel': ort.ExecutionMode.ORT_PARALLEL,
+    }[settings['execution_mode']]
+    return options
+
+
+def tflite_interpreter_kwargs(settings=None):
+    """Keyword arguments for a TFLite Interpreter from a tuned profile"""
+    if not settings:
+        return {}
+
+    kwargs = {'num_threads': settings['num_threads']}
+    if not settings.get('xnnpack', True):
+        try:
+            from tflite_runtime.interpreter import OpResolverType
+        except ImportError:
+            from tensorflow.lite.experimental import OpResolverType
+        kwargs['experimental_op_resolver_type'] = OpResolverType.BUILTIN_WITHOUT_DEFAULT_DELEGATES
+    return kwargs
+
+
+def _thread_counts(cores):
+    counts = {1, cores}
+    counts.update(2 ** k for k in range(1, cores.bit_length()) if 2 ** k < cores)
+    return sorted(counts)
+
+
+def _time_runs(run, runs, warmup):
+    for _ in range(warmup):
+        run()
+    latencies = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        run()
+        latencies.append(time.perf_counter() - start)
+    latencies = np.array(latencies) * 1000
+    return float(np.median(latencies)), float(np.percentile(latencies, 95))
+
+
+def tune_onnx(model_path, batch_sizes=(1, 2, 4, 8), runs: int = 30, warmup: int = 5):
+    """Benchmark every onnxruntime configuration in the search space"""
+    import onnxruntime as ort
+
+    cores = os.cpu_count() or 1
+    probe = ort.InferenceSession(str(model_path), providers=['CPUExecutionProvider'])
+    model_input = probe.get_inputs()[0]
+    dynamic_batch = not isinstance(model_input.shape[0], int)
+    if not dynamic_batch:
+        # ultralytics ONNX exports have a fixed batch unless exported with dynamic=True
+        print(f"ℹ️  {Path(model_path).name} has a fixed batch of {model_input.shape[0]}, "
+              f"batch size is not searched (export with dynamic axes to tune it)")
+        batch_sizes = (model_input.shape[0],)
+    del probe
+
+    results = []
+    for intra, inter, level, mode in itertools.product(_thread_counts(cores), (1, 2), _GRAPH_LEVELS, _EXECUTION_MODES):
+        # inter-op threads only matter in parallel execution mode
+        if mode == 'sequential' and inter != 1:
+            continue
+
+        settings = {
+            'runtime': 'onnxruntime',
+            'intra_op_threads': intra,
+            'inter_op_threads': inter,
+            'graph_optimization': level,
+            'execution_mode': mode,
+        }
+        session = ort.InferenceSession(str(model_path), onnx_session_options(settings),
+                                       providers=['CPUExecutionProvider'])
+
+        for batch in batch_sizes:
+            dummy = np.random.rand(batch, *model_input.shape[1:]).astype(np.float32)
+            median_ms, p95_ms = _time_runs(lambda: session.run(None, {model_input.name: dummy}), runs, warmup)
+            results.append(dict(settings, batch_size=batch, median_ms=median_ms, p95_ms=p95_ms,
+                                images_per_second=1000 * batch / median_ms))
+
+    return results
+
+
+def tune_tflite(model_path, batch_sizes=(1, 2, 4, 8), runs: int = 30, warmup: int = 5):
+    """Benchmark TFLite thread counts, XNNPACK on/off and batch sizes"""
+    try:
+        from tflite_runtime.interpreter import Interpreter
+    except ImportError:
+        from tensorflow.lite import Interpreter
+
+    cores = os.cpu_count() or 1
+    results = []
+    for threads, xnnpack in itertools.product(_thread_counts(cores), (True, False)):
+        settings = {'runtime': 'tflite', 'num_threads': threads, 'xnnpack': xnnpack}
+
+        for batch in batch_sizes:
+            try:
+                interpreter = Interpreter(model_path=str(model_path), **tflite_interpreter_kwargs(settings))
+                input_detail = interpreter.get_input_details()[0]
+                shape = [batch, *input_detail['shape'][1:]]
+                if batch != input_detail['shape'][0]:
+                    interpreter.resize_tensor_input(input_detail['index'], shape)
+                interpreter.allocate_tensors()
+            except (RuntimeError, ValueError):
+                # Some exports cannot be resized to a larger batch
+                continue
+
+            dummy = np.random.rand(*shape).astype(input_detail['dtype'])
+
+            def run():
+                interpreter.set_tensor(input_detail['index'], dummy)
+                interpreter.invoke()
+
+            median_ms, p95_ms = _time_runs(run, runs, warmup)
+            results.append(dict(settings, batch_size=batch, median_ms=median_ms, p95_ms=p95_ms,
+                                images_per_second=1000 * batch / median_ms))
+
+    skipped = sorted(set(batch_sizes) - {result['batch_size'] for result in results})
+    if skipped:
+        print(f"ℹ️  {Path(model_path).name} could not be resized to batch size(s) {skipped}, "
+              f"they were not searched")
+    return results
+
+
+def pick_best(results, latency_cap_ms: float):
+    """Highest throughput whose p95 latency stays under the cap (fastest p95 if none do)"""
+    within_cap = [r for r in results if r['p95_ms'] <= latency_cap_ms]
+    if within_cap:
+        return max(within_cap, key=lambda r: r['images_per_second'])
+    return min(results, key=lambda r: r['p95_ms'])
+
+
+def tune(model_path, latency_cap_ms: float = 200.0, batch_sizes=(1, 2, 4, 8), runs: int = 30):
+    """
+    Tune an exported model on this host and persist the winning settings
+    Args:
+        model_path: Exported .onnx or .tflite model (e.g. in exports/)
+        latency_cap_ms: Maximum acceptable p95 latency per batch
+        batch_sizes: Batch sizes to try (only if the model accepts them)
+        runs: Timed runs per configuration
+    """
+    model_path = Path(model_path)
+    print(f"🎛️  Tuning {model_path.name} on {socket.gethostname()} "
+          f"({os.cpu_count()} cores, p95 cap {latency_cap_ms:.0f} ms)...")
+
+    if model_path.suffix == '.onnx':
+        results = tune_onnx(model_path, batch_sizes=batch_sizes, runs=runs)
+    elif model_path.suffix == '.tflite':
+        results = tune_tflite(model_path, batch_sizes=batch_sizes, runs=runs)
+    else:
+        raise ValueError(f"Unsupported model format: {model_path.suffix}")
+
+    if not results:
+        raise RuntimeError(f"No runtime configuration could be benchmarked for {model_path}")
+
+    best = pick_best(results, latency_cap_ms)
+    best['latency_cap_ms'] = latency_cap_ms
+    best['tuned_at'] = time.strftime('%Y-%m-%dT%H:%M:%S')
+    profile_path = save_runtime_profile(model_path, best)
+
+    for result in sorted(results, key=lambda r: r['images_per_second'], reverse=True)[:10]:
+        marker = '⭐' if result is best else '  '
+        settings = {k: v for k, v in result.items()
+                    if k not in ('runtime', 'median_ms', 'p95_ms', 'images_per_second')}
+        print(f"{marker} {result['images_per_second']:7.1f} img/s  p95 {result['p95_ms']:7.1f} ms  {settings}")
+
+    print(f"✅ Runtime profile saved: {profile_path}")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Auto-tune CPU inference settings for an exported model')
+    parser.add_argument('model', type=str, help='Exported .onnx or .tflite model')
+    parser.add_argument('--latency-cap', type=float, default=200.0, help='Maximum p95 latency (ms) per batch')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 2, 4, 8], help='Batch sizes to try')
+    parser.add_argument('--runs', type=int, default=30, help='Timed runs per configuration')
+    args = parser.parse_args()
+
+    tune(args.model, latency_cap_ms=args.latency_cap, batch_sizes=tuple(args.batch_sizes), runs=args.runs)
+
+
+if __name__ == '__main__':
+    main()
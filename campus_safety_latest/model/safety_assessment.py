@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Safety Assessment Helpers
+Python port of the scoring logic used by the Flutter ExitSignDetectionService
+"""
+
+import yaml
+from pathlib import Path
+
+CLASS_NAMES = ['exit', 'lit_exit_sign', 'unlit_exit_sign']
+
+DEFAULT_SAFETY_RULES = {
+    'minimum_exit_signs': 2,
+    'lit_sign_weight': 1.0,
+    'unlit_sign_weight': 0.3,
+    'general_exit_weight': 0.7,
+    'safety_thresholds': {
+        'safe': 0.8,
+        'caution': 0.5,
+        'unsafe': 0.0
+    }
+}
+
+
+def load_safety_config(config_path):
+    """Load safety_assessment_config.yaml (returns an empty dict if missing)"""
+    config_path = Path(config_path)
+    if not config_path.exists():
+        return {}
+
+    with open(config_path, 'r') as f:
+        return yaml.safe_load(f) or {}
+
+
+def get_safety_rules(config=None):
+    """Return safety rules from a loaded config, falling back to defaults"""
+    rules = dict(DEFAULT_SAFETY_RULES)
+    if config and 'safety_rules' in config:
+        rules.update(config['safety_rules'])
+    return rules
+
+
+def safety_level(score, config=None):
+    """Map a normalized safety score to 'safe', 'caution' or 'unsafe'"""
+    thresholds = get_safety_rules(config)['safety_thresholds']
+    if score >= thresholds['safe']:
+        return 'safe'
+    if score >= thresholds['caution']:
+        return 'caution'
+    return 'unsafe'
+
+
+def calculate_safety_score(detections, config=None):
+    """
+    Score a list of detections the same way the Flutter service does
+    Args:
+        detections: List of dicts with 'class_name' and 'confidence'
+        config: Loaded safety assessment config (optional)
+    Returns:
+        Dict with normalized score, safety level and per-class counts
+    """
+    rules = get_safety_rules(config)
+    weights = {
+        'lit_exit_sign': rules['lit_sign_weight'],
+        'unlit_exit_sign': rules['unlit_sign_weight'],
+        'exit': rules['general_exit_weight'],
+    }
+    counts = {'lit': 0, 'unlit': 0, 'general': 0}
+    count_keys = {'lit_exit_sign': 'lit', 'unlit_exit_sign': 'unlit', 'exit': 'general'}
+
+    score = 0.0
+    for detection in detections:
+        class_name = detection['class_name']
+        if class_name not in weights:
+            continue
+        counts[count_keys[class_name]] += 1
+        score += weights[class_name] * detection['confidence']
+
+    # Normalize score based on expected minimum number of exit signs
+    normalized_score = min(max(score / rules['minimum_exit_signs'], 0.0), 1.0)
+
+    return {
+        'score': normalized_score,
+        'level': safety_level(normalized_score, config),
+        'counts': counts,
+    }
+
+
+def results_to_detections(result, class_names=None):
+    """Convert an ultralytics Results object into detection dicts"""
+    class_names = class_names or CLASS_NAMES
+    detections = []
+    if result.boxes is None:
+        return detections
+
+    for box, conf, cls in zip(result.boxes.xywh.tolist(),
+                              result.boxes.conf.tolist(),
+                              result.boxes.cls.tolist()):
+        detections.append({
+            'bbox': box,
+            'confidence': float(conf),
+            'class_id': int(cls),
+            'class_name': class_names[int(cls)],
+        })
+    return detections
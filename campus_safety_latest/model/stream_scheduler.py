@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Multi-Camera Exit Sign Monitoring
+Decodes N camera streams (or local video files) in a thread pool, samples frames
+per stream, round-robins them into shared batches on one exported model and keeps
+a rolling safety score per camera
+"""
+
+import time
+import argparse
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import cv2
+
+from detect import ExitSignDetector
+from safety_assessment import calculate_safety_score, safety_level
+
+
+class CameraStream:
+    """Per-camera decode state: the latest sampled frame plus rate and lag bookkeeping"""
+
+    def __init__(self, name, source, sample_fps: float, window: int):
+        self.name = name
+        self.source = source
+        self.target_fps = sample_fps
+        self.sample_fps = sample_fps
+
+        self._lock = threading.Lock()
+        self._frame = None
+        self._captured_at = None
+        self._next_sample = 0.0
+
+        self.sampled = 0
+        self.dropped = 0   # Sampled frames overwritten before inference picked them up
+        self._dropped_seen = 0
+        self.processed = 0
+        self.finished = False
+        self.lags = deque(maxlen=50)
+        self.scores = deque(maxlen=window)
+
+    def offer(self, frame, captured_at):
+        """Publish a sampled frame, replacing any frame inference has not taken yet"""
+        with self._lock:
+            if self._frame is not None:
+                self.dropped += 1
+            self._frame = frame
+            self._captured_at = captured_at
+            self.sampled += 1
+
+    def take(self):
+        """Hand the pending frame (if any) to the scheduler"""
+        with self._lock:
+            frame, captured_at = self._frame, self._captured_at
+            self._frame = None
+            return frame, captured_at
+
+    def due(self, now):
+        """Whether the decoder should sample the current frame"""
+        with self._lock:
+            if now < self._next_sample:
+                return False
+            self._next_sample = now + 1.0 / self.sample_fps
+            return True
+
+    def new_drops(self):
+        """Frames dropped since the previous call"""
+        with self._lock:
+            drops = self.dropped - self._dropped_seen
+            self._dropped_seen = self.dropped
+            return drops
+
+    def adjust_rate(self, factor, min_fps):
+        with self._lock:
+            self.sample_fps = min(self.target_fps, max(min_fps, self.sample_fps * factor))
+
+    @property
+    def rolling_score(self):
+        return sum(self.scores) / len(self.scores) if self.scores else None
+
+
+def decode_stream(stream: CameraStream, stop: threading.Event, loop: bool = True):
+    """
+    Decoder thread body
+    Video files are paced at their native frame rate to behave like live cameras;
+    frames between samples are only grabbed, never converted
+    """
+    capture = cv2.VideoCapture(stream.source)
+    if not capture.isOpened():
+        print(f"❌ Could not open stream {stream.name}: {stream.source}")
+        stream.finished = True
+        return
+
+    source_fps = capture.get(cv2.CAP_PROP_FPS) or 0.0
+    is_file = Path(str(stream.source)).exists()
+    start = time.perf_counter()
+    frame_index = 0
+
+    try:
+        while not stop.is_set():
+            if is_file and source_fps > 0:
+                # Play files in real time, like a live feed
+                delay = start + frame_index / source_fps - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+
+            if not capture.grab():
+                if is_file and loop:
+                    capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                    start, frame_index = time.perf_counter(), 0
+                    continue
+                break
+            frame_index += 1
+
+            now = time.perf_counter()
+            if not stream.due(now):
+                continue
+
+            ok, frame = capture.retrieve()
+            if ok:
+                stream.offer(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB), now)
+    finally:
+        capture.release()
+        stream.finished = True
+
+
+class StreamScheduler:
+    """Fair round-robin batching of many camera streams onto one detector"""
+
+    def __init__(self, detector: ExitSignDetector, sources, sample_fps: float = 1.0,
+                 batch_size: int = None, min_fps: float = 0.1, max_lag: float = 2.0, window: int = 10):
+        """
+        Args:
+            detector: Shared ExitSignDetector
+            sources: Video files or stream URLs, one per camera
+            sample_fps: Target frames sampled per second per camera
+            batch_size: Frames per inference batch (defaults to one per camera)
+            min_fps: Lowest sample rate a camera is degraded to
+            max_lag: Seconds between capture and scoring before a camera is slowed down
+            window: Number of recent frames in the rolling safety score
+        """
+        self.detector = detector
+        self.streams = [CameraStream(f'cam{i}', source, sample_fps, window) for i, source in enumerate(sources)]
+        self.batch_size = batch_size or len(self.streams)
+        self.min_fps = min_fps
+        self.max_lag = max_lag
+        self._next_stream = 0
+        self._stop = threading.Event()
+
+    def _collect_batch(self):
+        """Take at most one pending frame per camera, starting after the last camera served"""
+        batch = []
+        count = len(self.streams)
+        for offset in range(count):
+            stream = self.streams[(self._next_stream + offset) % count]
+            frame, captured_at = stream.take()
+            if frame is not None:
+                batch.append((stream, frame, captured_at))
+                if len(batch) == self.batch_size:
+                    self._next_stream = (self._next_stream + offset + 1) % count
+                    return batch
+        self._next_stream = (self._next_stream + 1) % count
+        return batch
+
+    def _update_rates(self, stream: CameraStream, lag: float):
+        """Degrade by lowering the sample rate rather than queueing up stale frames"""
+        interval = 1.0 / stream.sample_fps
+        # Only recent drops count, so an early burst doesn't keep the rate pinned down
+        if lag > self.max_lag or stream.new_drops():
+            stream.adjust_rate(0.8, self.min_fps)
+        elif lag < min(self.max_lag / 2, interval):
+            # Double per second of healthy operation, whatever the current rate
+            stream.adjust_rate(2 ** interval, self.min_fps)
+
+    def report(self, elapsed):
+        total = sum(stream.processed for stream in self.streams)
+        print(f"\n📡 {len(self.streams)} cameras, {total / elapsed:.1f} frames/s total")
+        for stream in self.streams:
+            score = stream.rolling_score
+            level = '-' if score is None else safety_level(score, self.detector.config)
+            lag = sum(stream.lags) / len(stream.lags) if stream.lags else 0.0
+            print(f"   {stream.name}: {stream.sample_fps:4.2f}/{stream.target_fps:.2f} fps  "
+                  f"lag {lag * 1000:6.0f} ms  processed {stream.processed:5d}  dropped {stream.dropped:4d}  "
+                  f"score {'-' if score is None else f'{score:.0%}'} ({level})")
+
+    def run(self, duration: float = None, report_interval: float = 10.0, loop: bool = True):
+        """Run until duration elapses, all streams end, or Ctrl+C"""
+        print(f"🎥 Monitoring {len(self.streams)} cameras at {self.streams[0].target_fps} fps each, "
+              f"batch size {self.batch_size}")
+
+        with ThreadPoolExecutor(max_workers=len(self.streams), thread_name_prefix='decode') as pool:
+            for stream in self.streams:
+                pool.submit(decode_stream, stream, self._stop, loop)
+
+            start = last_report = time.perf_counter()
+            try:
+                while not all(stream.finished for stream in self.streams):
+                    now = time.perf_counter()
+                    if duration and now - start >= duration:
+                        break
+                    if now - last_report >= report_interval:
+                        self.report(now - start)
+                        last_report = now
+
+                    batch = self._collect_batch()
+                    if not batch:
+                        time.sleep(0.005)
+                        continue
+
+                    detections = self.detector.detect_batch([frame for _, frame, _ in batch])
+                    scored_at = time.perf_counter()
+                    for (stream, _, captured_at), frame_detections in zip(batch, detections):
+                        assessment = calculate_safety_score(frame_detections, self.detector.config)
+                        stream.scores.append(assessment['score'])
+                        stream.processed += 1
+                        lag = scored_at - captured_at
+                        stream.lags.append(lag)
+                        self._update_rates(stream, lag)
+            except KeyboardInterrupt:
+                print("\n⏹️  Stopping...")
+            finally:
+                self._stop.set()
+
+        self.report(time.perf_counter() - start)
+        return {stream.name: stream.rolling_score for stream in self.streams}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Periodic exit sign checks across many camera streams')
+    parser.add_argument('sources', type=str, nargs='+', help='Video files or stream URLs (one per camera)')
+    parser.add_argument('--model', type=str, default='exports/exit_detection_yolov8n.onnx',
+                       help='Exported ONNX model or .bundle')
+    parser.add_argument('--config', type=str, default=None, help='Path to safety_assessment_config.yaml')
+    parser.add_argument('--sample-fps', type=float, default=1.0, help='Target frames per second per camera')
+    parser.add_argument('--min-fps', type=float, default=0.1, help='Lowest degraded sample rate per camera')
+    parser.add_argument('--max-lag', type=float, default=2.0, help='Lag (s) that triggers a lower sample rate')
+    parser.add_argument('--batch', type=int, default=None, help='Frames per inference batch')
+    parser.add_argument('--window', type=int, default=10, help='Frames in the rolling safety score')
+    parser.add_argument('--duration', type=float, default=None, help='Stop after N seconds')
+    parser.add_argument('--report-interval', type=float, default=10.0, help='Seconds between reports')
+    parser.add_argument('--no-loop', action='store_true', help='Stop video files at their end instead of looping')
+    args = parser.parse_args()
+
+    detector = ExitSignDetector(args.model, args.config)
+    scheduler = StreamScheduler(detector, args.sources, sample_fps=args.sample_fps, batch_size=args.batch,
+                                min_fps=args.min_fps, max_lag=args.max_lag, window=args.window)
+    scheduler.run(duration=args.duration, report_interval=args.report_interval, loop=not args.no_loop)
+
+
+if __name__ == '__main__':
+    main()
@@ -13,8 +13,15 @@ from ultralytics import YOLO
 import torch
 import matplotlib.pyplot as plt
 import seaborn as sns
+import time
+import json
+import random
+import hashlib
 from datetime import datetime
 
+from safety_assessment import calculate_safety_score, results_to_detections, CLASS_NAMES
+from model_bundle import write_bundle
+
 class ExitSignTrainer:
     def __init__(self, data_path: str, model_size: str = 'n'):
         """
@@ -27,6 +34,22 @@ class ExitSignTrainer:
         self.model_size = model_size
         self.model = None
         self.results = None
+        self.imgsz = 640
+        self.input_shape = (640, 640)  # (height, width) of the exported model input
+        self.confidence_threshold = 0.5
+        self.iou_threshold = 0.45
+        
+        # Optional decoding + NMS baked into the exported graph
+        self.embed_nms = False
+        self.max_detections = 100
+        
+        # Optional low-resolution gate for the two-stage cascade
+        self.gate_model = None
+        self.gate_imgsz = 160
+        self.cascade_thresholds = {
+            'reject_below': 0.15,  # Gate max confidence below this -> no exit signs
+            'accept_above': 0.6,   # Gate max confidence above this -> trust gate detections
+        }
         
         # Create output directories
         self.output_dir = Path('runs/train')
@@ -88,18 +111,26 @@ class ExitSignTrainer:
         
         return data_config
     
-    def train(self, epochs: int = 100, imgsz: int = 640, batch_size: int = 16):
-        """Train the model"""
+    def train(self, epochs: int = 100, imgsz=640, batch_size: int = 16):
+        """
+        Train the model
+        Args:
+            epochs: Number of training epochs
+            imgsz: Square size (int) or rectangular (height, width) input shape
+            batch_size: Batch size
+        """
+        self._set_input_shape(imgsz)
+        
         print(f"🚀 Starting training...")
         print(f"⏱️  Epochs: {epochs}")
-        print(f"🖼️  Image size: {imgsz}")
+        print(f"🖼️  Image size: {self.input_shape[1]}x{self.input_shape[0]} (WxH)")
         print(f"📦 Batch size: {batch_size}")
         
         # Training parameters optimized for exit sign detection
         self.results = self.model.train(
             data=str(self.data_path / 'data.yaml'),
             epochs=epochs,
-            imgsz=imgsz,
+            imgsz=self.imgsz,
             batch=batch_size,
             device='auto',  # Automatically select GPU if available
             
@@ -153,8 +184,121 @@ class ExitSignTrainer:
         )
         
         print("✅ Training completed!")
+        self.save_dataset_manifest(self.model.trainer.best)
         return self.results
     
+    def _set_input_shape(self, imgsz):
+        """Record the model input shape from an int or (height, width) pair"""
+        if isinstance(imgsz, int):
+            self.input_shape = (imgsz, imgsz)
+        else:
+            height, width = imgsz
+            if height % 32 or width % 32:
+                raise ValueError(f"Input shape {height}x{width} must be a multiple of the model stride (32)")
+            self.input_shape = (height, width)
+        
+        # Train square at the long side: rect=True would turn off mosaic and shuffling,
+        # the rectangular shape is only applied at export
+        self.imgsz = max(self.input_shape)
+    
+    def _num_anchors(self):
+        """Number of YOLOv8 anchor points for the current input shape (strides 8/16/32)"""
+        height, width = self.input_shape
+        return sum((height // stride) * (width // stride) for stride in (8, 16, 32))
+    
+    def _export_imgsz(self):
+        """imgsz argument for export: int for square inputs, [height, width] otherwise"""
+        height, width = self.input_shape
+        return height if height == width else [height, width]
+    
+    def benchmark_input_shapes(self, shapes, runs: int = 50):
+        """
+        Compare ONNX latency and validation mAP across input shapes
+        Args:
+            shapes: List of (height, width) input shapes, e.g. [(640, 640), (640, 480)]
+            runs: Timed inference runs per shape
+        """
+        import numpy as np
+        from detect import ExitSignDetector, evaluate_map
+        
+        if self.model is None:
+            raise ValueError("Model not trained yet. Call train() first.")
+        
+        val_images = self._split_images('valid')
+        report = []
+        for height, width in shapes:
+            print(f"⏱️  Benchmarking input {width}x{height} (WxH)...")
+            imgsz = height if height == width else [height, width]
+            onnx_path = self.model.export(format='onnx', imgsz=imgsz, device='cpu', verbose=False)
+            
+            detector = ExitSignDetector(onnx_path)
+            session, input_name = detector.session, detector.input_name
+            dummy = np.random.rand(1, 3, height, width).astype(np.float32)
+            for _ in range(5):
+                session.run(None, {input_name: dummy})
+            start = time.perf_counter()
+            for _ in range(runs):
+                session.run(None, {input_name: dummy})
+            latency_ms = 1000 * (time.perf_counter() - start) / runs
+            
+            # ultralytics val() collapses a [height, width] imgsz to its long side, so score the
+            # exported session ourselves with every image letterboxed into exactly this shape
+            metrics = evaluate_map(detector, val_images)
+            report.append({
+                'input_shape': [height, width],
+                'latency_ms': latency_ms,
+                'mAP50': metrics['mAP50'],
+                'mAP50-95': metrics['mAP50-95'],
+            })
+        
+        baseline = report[0]
+        print("\n📊 Input shape report")
+        for entry in report:
+            height, width = entry['input_shape']
+            saved = 1 - entry['latency_ms'] / baseline['latency_ms']
+            print(f"   {width}x{height}: {entry['latency_ms']:6.1f} ms ({saved:+.0%} saved)  "
+                  f"mAP50 {entry['mAP50']:.4f} ({entry['mAP50'] - baseline['mAP50']:+.4f})  "
+                  f"mAP50-95 {entry['mAP50-95']:.4f} ({entry['mAP50-95'] - baseline['mAP50-95']:+.4f})")
+        
+        return report
+    
+    def train_distributed(self, nproc: int, epochs: int = 100, imgsz=640, batch_size: int = 16):
+        """
+        Train with CPU data parallelism across local processes (gloo backend)
+        Like train(), a (height, width) imgsz trains square at the long side and is exported rectangular
+        """
+        from distributed_train import launch
+        
+        print(f"🌐 Starting distributed CPU training on {nproc} processes...")
+        self._set_input_shape(imgsz)
+        run_name = f'exit_detection_yolov8{self.model_size}_ddp_{datetime.now().strftime("%Y%m%d_%H%M%S")}'
+        
+        launch(argparse.Namespace(
+            data=str(self.data_path),
+            model=self.model_size,
+            epochs=epochs,
+            batch=batch_size,
+            imgsz=self.imgsz,
+            workers=2,
+            nproc=nproc,
+            nnodes=1,
+            node_rank=0,
+            master_addr='127.0.0.1',
+            master_port=29500,
+            val_period=1,
+            no_val=False,
+            max_steps=0,
+            project='runs/train',
+            name=run_name,
+        ))
+        
+        # Continue the pipeline from the checkpoint written by rank 0
+        best_weights = self.output_dir / run_name / 'weights' / 'best.pt'
+        self.model = YOLO(str(best_weights))
+        print(f"✅ Distributed training completed! Best weights: {best_weights}")
+        self.save_dataset_manifest(best_weights)
+        return best_weights
+    
     def evaluate(self):
         """Evaluate the trained model"""
         if self.model is None:
@@ -178,13 +322,291 @@ class ExitSignTrainer:
         
         return validation_results
     
-    def export_models(self):
-        """Export model in multiple formats for deployment"""
-        if self.model is None:
-            raise ValueError("Model not trained yet. Call train() first.")
+    @property
+    def manifest_path(self):
+        return self.output_dir / 'dataset_manifest.json'
+    
+    def _image_digest(self, image_path: Path):
+        """Hash an image together with its label file so relabelled images count as new"""
+        digest = hashlib.sha256(image_path.read_bytes())
+        label_path = Path(str(image_path.parent).replace('images', 'labels')) / f'{image_path.stem}.txt'
+        if label_path.exists():
+            digest.update(label_path.read_bytes())
+        return digest.hexdigest()
+    
+    def build_dataset_manifest(self):
+        """Map every training image (relative to the dataset) to its content hash"""
+        return {
+            str(image.relative_to(self.data_path)): self._image_digest(image)
+            for image in self._split_images('train')
+        }
+    
+    def save_dataset_manifest(self, checkpoint):
+        """Record which images the given checkpoint was trained on"""
+        manifest = {
+            'checkpoint': str(checkpoint),
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'images': self.build_dataset_manifest(),
+        }
+        with open(self.manifest_path, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        print(f"🗂️  Dataset manifest saved: {self.manifest_path} ({len(manifest['images'])} images)")
+        return self.manifest_path
+    
+    def load_dataset_manifest(self):
+        """Load the manifest written by the last training run"""
+        if not self.manifest_path.exists():
+            raise FileNotFoundError(
+                f"No dataset manifest at {self.manifest_path}. Run a full train() first."
+            )
+        with open(self.manifest_path, 'r') as f:
+            return json.load(f)
+    
+    def train_incremental(self, epochs: int = 15, imgsz=640, batch_size: int = 16,
+                          freeze: int = 10, replay_ratio: float = 2.0, map_tolerance: float = 0.01):
+        """
+        Fine-tune the last best checkpoint on newly labelled images
+        Args:
+            epochs: Fine-tuning epochs
+            imgsz: Square size (int) or rectangular (height, width) input shape
+            batch_size: Batch size
+            freeze: Number of leading YOLOv8 layers to freeze (10 = whole backbone)
+            replay_ratio: Old images replayed per new image to avoid forgetting
+            map_tolerance: Allowed drop in validation mAP50-95 before the update is rejected
+        """
+        self._set_input_shape(imgsz)
+        manifest = self.load_dataset_manifest()
+        checkpoint = Path(manifest['checkpoint'])
+        if not checkpoint.exists():
+            raise FileNotFoundError(f"Checkpoint from manifest not found: {checkpoint}")
         
-        print("📱 Exporting models for deployment...")
+        current = self.build_dataset_manifest()
+        new_images = [name for name, digest in current.items() if manifest['images'].get(name) != digest]
+        old_images = [name for name in current if name not in new_images]
+        
+        if not new_images:
+            print("✅ No new labelled images since the last training run")
+            self.model = YOLO(str(checkpoint))
+            return None
+        
+        # Replay a sample of previously seen images alongside the new ones
+        rng = random.Random(42)
+        replay = rng.sample(old_images, min(len(old_images), round(len(new_images) * replay_ratio)))
+        print(f"🆕 New images: {len(new_images)}, replayed old images: {len(replay)}")
+        
+        run_name = f'exit_detection_yolov8{self.model_size}_incremental_{datetime.now().strftime("%Y%m%d_%H%M%S")}'
+        run_dir = self.output_dir / run_name
+        run_dir.mkdir(parents=True, exist_ok=True)
+        
+        with open(self.data_path / 'data.yaml', 'r') as f:
+            data_config = yaml.safe_load(f)
+        val_path = (self.data_path / data_config['val'].replace('../', '')).resolve()
+        
+        train_list = run_dir / 'train.txt'
+        with open(train_list, 'w') as f:
+            for name in new_images + replay:
+                f.write(f"{(self.data_path / name).resolve()}\n")
+        
+        incremental_yaml = run_dir / 'data.yaml'
+        with open(incremental_yaml, 'w') as f:
+            yaml.dump({
+                'train': str(train_list.resolve()),
+                'val': str(val_path),
+                'nc': data_config['nc'],
+                'names': data_config['names'],
+            }, f, default_flow_style=False)
+        
+        # Baseline on the unchanged validation split
+        previous = YOLO(str(checkpoint))
+        baseline = previous.val(data=str(incremental_yaml), imgsz=self.imgsz, plots=False, verbose=False)
+        print(f"📊 Previous checkpoint mAP50-95: {baseline.box.map:.4f}")
+        
+        print(f"🔁 Fine-tuning {checkpoint} for {epochs} epochs with {freeze} frozen layers...")
+        self.model = YOLO(str(checkpoint))
+        self.model.train(
+            data=str(incremental_yaml),
+            epochs=epochs,
+            imgsz=self.imgsz,
+            batch=batch_size,
+            device='auto',
+            freeze=freeze,  # Keep the backbone fixed, only adapt neck and head
+            
+            # Short, gentle schedule on top of an already trained model
+            lr0=0.002,
+            warmup_epochs=0,
+            mosaic=1.0,
+            fliplr=0.5,
+            
+            val=True,
+            project='runs/train',
+            name=run_name,
+            exist_ok=True,
+            workers=8,
+            seed=42,
+            deterministic=True,
+            plots=True,
+            save=True,
+        )
+        
+        updated = self.model.val(data=str(incremental_yaml), imgsz=self.imgsz, plots=False, verbose=False)
+        delta = updated.box.map - baseline.box.map
+        held = delta >= -map_tolerance
+        print(f"📊 Fine-tuned mAP50-95: {updated.box.map:.4f} ({delta:+.4f})")
+        
+        if held:
+            print("✅ Validation mAP held, adopting the fine-tuned checkpoint")
+            self.save_dataset_manifest(self.model.trainer.best)
+        else:
+            print(f"⚠️  Validation mAP dropped by more than {map_tolerance}, keeping {checkpoint}")
+            self.model = previous
+        
+        return {
+            'new_images': len(new_images),
+            'replayed_images': len(replay),
+            'previous_map': baseline.box.map,
+            'updated_map': updated.box.map,
+            'map_held': held,
+        }
+    
+    def cross_validate(self, k: int = 5, epochs: int = 50, imgsz: int = 640, batch_size: int = 8,
+                       parallel: int = None):
+        """Stratified k-fold cross-validation with folds trained concurrently on CPU"""
+        from kfold_cv import run_kfold
+        
+        return run_kfold(self.data_path, k=k, model_size=self.model_size, epochs=epochs,
+                         imgsz=imgsz, batch=batch_size, parallel=parallel)
+    
+    def _split_images(self, split: str = 'test'):
+        """List image files for a dataset split defined in data.yaml"""
+        with open(self.data_path / 'data.yaml', 'r') as f:
+            data_config = yaml.safe_load(f)
+        
+        key = 'val' if split == 'valid' else split
+        if key not in data_config:
+            raise ValueError(f"Split '{split}' not defined in data.yaml")
+        
+        split_path = self.data_path / data_config[key].replace('../', '')
+        return sorted(list(split_path.glob('*.jpg')) + list(split_path.glob('*.png')))
+    
+    def train_cascade_gate(self, epochs: int = 50, imgsz: int = 160, batch_size: int = 32):
+        """Train a low-resolution YOLOv8n used as a cheap "any exit sign?" gate"""
+        print(f"🚦 Training cascade gate (YOLOv8n @ {imgsz}px)...")
+        self.gate_imgsz = imgsz
+        self.gate_model = YOLO('yolov8n.pt')
+        
+        self.gate_model.train(
+            data=str(self.data_path / 'data.yaml'),
+            epochs=epochs,
+            imgsz=imgsz,
+            batch=batch_size,
+            device='auto',
+            
+            # Keep augmentation light, the gate only needs presence not precise boxes
+            hsv_h=0.015,
+            hsv_s=0.7,
+            hsv_v=0.4,
+            translate=0.1,
+            scale=0.5,
+            fliplr=0.5,
+            mosaic=1.0,
+            
+            val=True,
+            project='runs/train',
+            name=f'exit_detection_gate_{imgsz}_{datetime.now().strftime("%Y%m%d_%H%M%S")}',
+            exist_ok=True,
+            workers=8,
+            seed=42,
+            deterministic=True,
+            patience=25,
+            plots=True,
+            save=True,
+        )
+        
+        print("✅ Cascade gate training completed!")
+        return self.gate_model
+    
+    def predict_cascade(self, image, conf: float = None):
+        """
+        Run the two-stage cascade on a single image
+        Args:
+            image: Image path or array
+            conf: Detection confidence (defaults to the exported confidence_threshold)
+        Returns:
+            Tuple of (detections, stage) where stage is 'gate' or 'full'
+        """
+        if self.model is None or self.gate_model is None:
+            raise ValueError("Cascade needs both the full model and the gate. Call train_cascade_gate() first.")
+        conf = self.confidence_threshold if conf is None else conf
+        
+        # The gate must keep boxes down to reject_below, otherwise low scores read as "no boxes"
+        reject_below = self.cascade_thresholds['reject_below']
+        gate_result = self.gate_model.predict(image, imgsz=self.gate_imgsz, conf=min(conf, reject_below),
+                                              iou=self.iou_threshold, verbose=False)[0]
+        gate_detections = results_to_detections(gate_result, CLASS_NAMES)
+        max_conf = max((d['confidence'] for d in gate_detections), default=0.0)
+        
+        # Clear negatives and clear positives stop at the gate
+        if max_conf < reject_below:
+            return [], 'gate'
+        if max_conf >= self.cascade_thresholds['accept_above']:
+            return [d for d in gate_detections if d['confidence'] >= conf], 'gate'
+        
+        # Ambiguous images escalate to the full detector
+        full_result = self.model.predict(image, conf=conf, iou=self.iou_threshold, verbose=False)[0]
+        return results_to_detections(full_result, CLASS_NAMES), 'full'
+    
+    def benchmark_cascade(self, split: str = 'test', conf: float = None):
+        """
+        Compare cascade latency and safety-level agreement against the single-stage model
+        Uses the exported thresholds and safety rules unless conf is given
+        """
+        images = self._split_images(split)
+        if not images:
+            raise FileNotFoundError(f"No images found for split '{split}'")
+        conf = self.confidence_threshold if conf is None else conf
+        config = self._safety_assessment_config()
+        
+        print(f"⏱️  Benchmarking cascade on {len(images)} {split} images...")
+        
+        # Warm up both models so the first image doesn't skew the timing
+        self.predict_cascade(str(images[0]), conf=conf)
+        self.model.predict(str(images[0]), conf=conf, iou=self.iou_threshold, verbose=False)
+        
+        single_times, cascade_times = [], []
+        agreements = 0
+        escalated = 0
+        
+        for image_path in images:
+            start = time.perf_counter()
+            full_result = self.model.predict(str(image_path), conf=conf, iou=self.iou_threshold, verbose=False)[0]
+            single_times.append(time.perf_counter() - start)
+            single_level = calculate_safety_score(results_to_detections(full_result, CLASS_NAMES), config)['level']
+            
+            start = time.perf_counter()
+            detections, stage = self.predict_cascade(str(image_path), conf=conf)
+            cascade_times.append(time.perf_counter() - start)
+            cascade_level = calculate_safety_score(detections, config)['level']
+            
+            agreements += int(single_level == cascade_level)
+            escalated += int(stage == 'full')
+        
+        report = {
+            'images': len(images),
+            'single_stage_ms': 1000 * sum(single_times) / len(single_times),
+            'cascade_ms': 1000 * sum(cascade_times) / len(cascade_times),
+            'escalation_rate': escalated / len(images),
+            'safety_level_agreement': agreements / len(images),
+        }
+        
+        print(f"📊 Single-stage latency: {report['single_stage_ms']:.1f} ms/image")
+        print(f"📊 Cascade latency: {report['cascade_ms']:.1f} ms/image")
+        print(f"📊 Escalated to full detector: {report['escalation_rate']:.1%}")
+        print(f"📊 Safety-level agreement: {report['safety_level_agreement']:.1%}")
         
+        return report
+    
+    def _export_model(self, model, export_name: str, imgsz=None, **export_args):
+        """Export a single model to all deployment formats"""
         export_formats = [
             ('ONNX', 'onnx'),           # For general deployment
             ('TensorFlow Lite', 'tflite'),  # For Android
@@ -192,6 +614,9 @@ class ExitSignTrainer:
             ('TensorRT', 'engine'),     # For NVIDIA GPUs
         ]
         
+        extra_args = dict(export_args)
+        if imgsz is not None:
+            extra_args['imgsz'] = imgsz
         exported_models = {}
         
         for format_name, format_ext in export_formats:
@@ -200,21 +625,23 @@ class ExitSignTrainer:
                 
                 if format_ext == 'engine':
                     # TensorRT requires specific settings
-                    exported_path = self.model.export(
+                    exported_path = model.export(
                         format=format_ext,
                         device='cuda' if torch.cuda.is_available() else 'cpu',
                         workspace=4,  # GB
-                        verbose=True
+                        verbose=True,
+                        **extra_args
                     )
                 else:
-                    exported_path = self.model.export(
+                    exported_path = model.export(
                         format=format_ext,
                         device='cpu',  # Export on CPU for compatibility
-                        verbose=True
+                        verbose=True,
+                        **extra_args
                     )
                 
                 # Move to export directory
-                export_filename = f"exit_detection_yolov8{self.model_size}.{format_ext}"
+                export_filename = f"{export_name}.{format_ext}"
                 final_path = self.export_dir / export_filename
                 
                 if os.path.exists(exported_path):
@@ -229,16 +656,142 @@ class ExitSignTrainer:
         
         return exported_models
     
-    def create_safety_assessment_config(self):
-        """Create configuration for safety assessment based on exit sign detection"""
+    def export_models(self):
+        """Export model in multiple formats for deployment"""
+        if self.model is None:
+            raise ValueError("Model not trained yet. Call train() first.")
+        
+        print("📱 Exporting models for deployment...")
+        
+        nms_args = {}
+        if self.embed_nms:
+            # Append box decoding, class max and NMS to the graph, then simplify/fuse it
+            print(f"🧩 Embedding NMS (conf={self.confidence_threshold}, iou={self.iou_threshold}, "
+                  f"max_det={self.max_detections})")
+            nms_args = {
+                'nms': True,
+                'simplify': True,
+                'conf': self.confidence_threshold,
+                'iou': self.iou_threshold,
+                'max_det': self.max_detections,
+            }
+        
+        exported_models = self._export_model(
+            self.model, f"exit_detection_yolov8{self.model_size}", imgsz=self._export_imgsz(), **nms_args
+        )
+        
+        if self.gate_model is not None:
+            print("🚦 Exporting cascade gate...")
+            gate_nms_args = dict(nms_args)
+            if gate_nms_args:
+                # The gate must still emit boxes down to reject_below so ambiguous images escalate
+                gate_nms_args['conf'] = self._gate_confidence_threshold()
+            gate_models = self._export_model(
+                self.gate_model, f"exit_detection_yolov8{self.model_size}_gate", imgsz=self.gate_imgsz,
+                **gate_nms_args
+            )
+            for format_name, path in gate_models.items():
+                exported_models[f"{format_name} (gate)"] = path
+        
+        bundle_path = self.create_model_bundle(exported_models)
+        if bundle_path is not None:
+            exported_models['Bundle'] = bundle_path
+        
+        return exported_models
+    
+    def _gate_confidence_threshold(self):
+        """Lowest gate score that still matters to the cascade decision"""
+        return min(self.confidence_threshold, self.cascade_thresholds['reject_below'])
+    
+    def create_model_bundle(self, exported_models):
+        """Pack exported ONNX/TFLite models and their config into one versioned bundle"""
+        bundled_formats = {
+            'ONNX': 'onnx',
+            'TensorFlow Lite': 'tflite',
+            'ONNX (gate)': 'onnx_gate',
+            'TensorFlow Lite (gate)': 'tflite_gate',
+        }
+        models = {
+            section: exported_models[format_name]
+            for format_name, section in bundled_formats.items()
+            if format_name in exported_models and Path(exported_models[format_name]).is_file()
+        }
+        if not models:
+            print("⚠️  No ONNX/TFLite exports to bundle")
+            return None
+        
+        config = self._safety_assessment_config()
+        model_info = config['model_info']
+        version = f"{model_info['version']}+{datetime.now().strftime('%Y%m%d%H%M%S')}"
+        metadata = {
+            'name': model_info['name'],
+            'version': version,
+            'labels': model_info['classes'],
+            'input_shape': {
+                'onnx': [1, 3, *self.input_shape],
+                'tflite': [1, *self.input_shape, 3],
+            },
+            'thresholds': {
+                'confidence_threshold': model_info['confidence_threshold'],
+                'iou_threshold': model_info['iou_threshold'],
+                'safety_thresholds': config['safety_rules']['safety_thresholds'],
+            },
+            'config': config,
+        }
+        
+        bundle_path = self.export_dir / f"{model_info['name']}-v{model_info['version']}.bundle"
+        write_bundle(bundle_path, models, metadata)
+        print(f"📦 Model bundle created: {bundle_path} (version {version})")
+        return bundle_path
+    
+    def profile_exports(self, exported_models, runs: int = 100):
+        """Per-operator profiling of the exported ONNX/TFLite models"""
+        from model_profiler import profile_onnx, profile_tflite, yolo_layer_names, format_report
+        
+        print(f"🔬 Profiling exported models ({runs} runs)...")
+        layer_names = yolo_layer_names(self.model) if self.model is not None else {}
+        reports = {}
+        
+        for format_name, profiler in [('ONNX', profile_onnx), ('TensorFlow Lite', profile_tflite)]:
+            model_path = exported_models.get(format_name)
+            if model_path is None or not Path(model_path).is_file():
+                continue
+            try:
+                if profiler is profile_onnx:
+                    profile = profiler(model_path, runs=runs, output_dir=self.export_dir, layer_names=layer_names)
+                else:
+                    profile = profiler(model_path, runs=runs)
+            except Exception as e:
+                print(f"⚠️  Failed to profile {format_name}: {str(e)}")
+                continue
+            
+            report_path = self.export_dir / f"{Path(model_path).stem}_{Path(model_path).suffix[1:]}_profile.txt"
+            with open(report_path, 'w') as f:
+                f.write(format_report(profile))
+            reports[format_name] = report_path
+            print(f"📋 {format_name} profile report: {report_path}")
+            if profile.get('trace'):
+                print(f"🧭 {format_name} trace: {profile['trace']}")
+        
+        return reports
+    
+    def _safety_assessment_config(self):
+        """Build the safety assessment configuration dict"""
         config = {
             'model_info': {
                 'name': f'exit_detection_yolov8{self.model_size}',
                 'version': '1.0',
                 'classes': ['exit', 'lit_exit_sign', 'unlit_exit_sign'],
-                'input_size': [640, 640],
-                'confidence_threshold': 0.5,
-                'iou_threshold': 0.45
+                'input_size': list(self.input_shape),  # [height, width]
+                'input_height': self.input_shape[0],
+                'input_width': self.input_shape[1],
+                'letterbox': True,
+                'confidence_threshold': self.confidence_threshold,
+                'iou_threshold': self.iou_threshold,
+                'embedded_nms': self.embed_nms,
+                # Embedded NMS: [1, max_detections, 6] rows of (x1, y1, x2, y2, score, class_id)
+                'output_shape': ([1, self.max_detections, 6] if self.embed_nms
+                                 else [1, 4 + len(CLASS_NAMES), self._num_anchors()]),
             },
             'safety_rules': {
                 'minimum_exit_signs': 2,  # Minimum number of visible exit signs for safety
@@ -263,6 +816,26 @@ class ExitSignTrainer:
             }
         }
         
+        if self.gate_model is not None:
+            gate_anchors = sum((self.gate_imgsz // stride) ** 2 for stride in (8, 16, 32))
+            config['cascade'] = {
+                'enabled': True,
+                'gate_model': f'exit_detection_yolov8{self.model_size}_gate',
+                'gate_input_size': [self.gate_imgsz, self.gate_imgsz],
+                'gate_embedded_nms': self.embed_nms,
+                'gate_confidence_threshold': self._gate_confidence_threshold(),
+                'gate_output_shape': ([1, self.max_detections, 6] if self.embed_nms
+                                      else [1, 4 + len(CLASS_NAMES), gate_anchors]),
+                'reject_below': self.cascade_thresholds['reject_below'],
+                'accept_above': self.cascade_thresholds['accept_above'],
+            }
+        
+        return config
+    
+    def create_safety_assessment_config(self):
+        """Create configuration for safety assessment based on exit sign detection"""
+        config = self._safety_assessment_config()
+        
         config_path = self.export_dir / 'safety_assessment_config.yaml'
         with open(config_path, 'w') as f:
             yaml.dump(config, f, default_flow_style=False, indent=2)
@@ -290,9 +863,13 @@ class ExitSignDetectionService {
   List<String> _labels = ['exit', 'lit_exit_sign', 'unlit_exit_sign'];
   
   // Safety assessment configuration
-  static const double confidenceThreshold = 0.5;
-  static const double iouThreshold = 0.45;
-  static const int inputSize = 640;
+  static const double confidenceThreshold = __CONFIDENCE_THRESHOLD__;
+  static const double iouThreshold = __IOU_THRESHOLD__;
+  static const bool embeddedNms = __EMBEDDED_NMS__;
+  static const int maxDetections = __MAX_DETECTIONS__;
+  static const int inputWidth = __INPUT_WIDTH__;
+  static const int inputHeight = __INPUT_HEIGHT__;
+  static const int numAnchors = __NUM_ANCHORS__;
   
   Future<void> initialize() async {
     try {
@@ -318,16 +895,24 @@ class ExitSignDetectionService {
         throw Exception('Failed to decode image');
       }
       
-      // Resize and normalize
-      final resizedImage = img.copyResize(image, width: inputSize, height: inputSize);
-      final input = _imageToByteListFloat32(resizedImage);
-      
-      // Run inference
-      final output = List.filled(1 * 25200 * 8, 0.0).reshape([1, 25200, 8]);
-      _interpreter!.run(input, output);
+      // Letterbox (keep aspect ratio, pad the rest) and normalize
+      final letterbox = _letterbox(image);
+      final input = _imageToByteListFloat32(letterbox.image);
       
-      // Parse detections
-      final detections = _parseDetections(output[0]);
+      // Run inference and parse detections
+      final List<Detection> detections;
+      if (embeddedNms) {
+        // Decoding and NMS run inside the model: [1, maxDetections, 6]
+        final output = List.filled(1 * maxDetections * 6, 0.0).reshape([1, maxDetections, 6]);
+        _interpreter!.run(input, output);
+        detections = _parseNmsDetections(output[0], letterbox);
+      } else {
+        // Raw YOLOv8 output: [1, 4 + classes, anchors]
+        final outputChannels = 4 + _labels.length;
+        final output = List.filled(1 * outputChannels * numAnchors, 0.0).reshape([1, outputChannels, numAnchors]);
+        _interpreter!.run(input, output);
+        detections = _parseDetections(output[0], letterbox);
+      }
       
       // Calculate safety score
       final assessment = _calculateSafetyScore(detections);
@@ -339,13 +924,29 @@ class ExitSignDetectionService {
     }
   }
   
+  LetterboxResult _letterbox(img.Image image) {
+    // Scale to fit inside the model input without distorting the photo
+    final scale = [inputWidth / image.width, inputHeight / image.height].reduce((a, b) => a < b ? a : b);
+    final newWidth = (image.width * scale).round();
+    final newHeight = (image.height * scale).round();
+    final padX = (inputWidth - newWidth) ~/ 2;
+    final padY = (inputHeight - newHeight) ~/ 2;
+    
+    final resized = img.copyResize(image, width: newWidth, height: newHeight);
+    final canvas = img.Image(inputWidth, inputHeight);
+    img.fill(canvas, img.getColor(114, 114, 114));
+    img.copyInto(canvas, resized, dstX: padX, dstY: padY, blend: false);
+    
+    return LetterboxResult(image: canvas, scale: scale, padX: padX, padY: padY);
+  }
+  
   Float32List _imageToByteListFloat32(img.Image image) {
-    final convertedBytes = Float32List(1 * inputSize * inputSize * 3);
+    final convertedBytes = Float32List(1 * inputHeight * inputWidth * 3);
     final buffer = Float32List.view(convertedBytes.buffer);
     int pixelIndex = 0;
     
-    for (int i = 0; i < inputSize; i++) {
-      for (int j = 0; j < inputSize; j++) {
+    for (int i = 0; i < inputHeight; i++) {
+      for (int j = 0; j < inputWidth; j++) {
         final pixel = image.getPixel(j, i);
         buffer[pixelIndex++] = (img.getRed(pixel) / 255.0);
         buffer[pixelIndex++] = (img.getGreen(pixel) / 255.0);
@@ -353,36 +954,70 @@ class ExitSignDetectionService {
       }
     }
     
-    return convertedBytes.reshape([1, inputSize, inputSize, 3]);
+    return convertedBytes.reshape([1, inputHeight, inputWidth, 3]);
   }
   
-  List<Detection> _parseDetections(List<List<double>> output) {
+  List<Detection> _parseDetections(List<List<double>> output, LetterboxResult letterbox) {
     final detections = <Detection>[];
     
-    for (int i = 0; i < output.length; i++) {
-      final detection = output[i];
-      final confidence = detection[4];
-      
-      if (confidence > confidenceThreshold) {
-        final classScores = detection.sublist(5);
-        final maxClassIndex = classScores.indexOf(classScores.reduce((a, b) => a > b ? a : b));
-        final classConfidence = classScores[maxClassIndex];
-        
-        if (classConfidence > confidenceThreshold) {
-          detections.add(Detection(
-            bbox: [detection[0], detection[1], detection[2], detection[3]],
-            confidence: confidence * classConfidence,
-            classId: maxClassIndex,
-            className: _labels[maxClassIndex],
-          ));
+    for (int i = 0; i < numAnchors; i++) {
+      int maxClassIndex = 0;
+      double classConfidence = output[4][i];
+      for (int c = 1; c < _labels.length; c++) {
+        if (output[4 + c][i] > classConfidence) {
+          classConfidence = output[4 + c][i];
+          maxClassIndex = c;
         }
       }
+      
+      if (classConfidence > confidenceThreshold) {
+        // Boxes are normalized to the model input, map them back to the original photo
+        final cx = (output[0][i] * inputWidth - letterbox.padX) / letterbox.scale;
+        final cy = (output[1][i] * inputHeight - letterbox.padY) / letterbox.scale;
+        final w = output[2][i] * inputWidth / letterbox.scale;
+        final h = output[3][i] * inputHeight / letterbox.scale;
+        
+        detections.add(Detection(
+          bbox: [cx, cy, w, h],
+          confidence: classConfidence,
+          classId: maxClassIndex,
+          className: _labels[maxClassIndex],
+        ));
+      }
     }
     
     // Apply Non-Maximum Suppression
     return _applyNMS(detections);
   }
   
+  List<Detection> _parseNmsDetections(List<List<double>> output, LetterboxResult letterbox) {
+    final detections = <Detection>[];
+    
+    for (final row in output) {
+      // Rows are sorted by score and zero-padded after the last detection
+      final confidence = row[4];
+      if (confidence <= confidenceThreshold) {
+        continue;
+      }
+      
+      // Boxes are normalized xyxy on the model input, map them back to the original photo
+      final x1 = (row[0] * inputWidth - letterbox.padX) / letterbox.scale;
+      final y1 = (row[1] * inputHeight - letterbox.padY) / letterbox.scale;
+      final x2 = (row[2] * inputWidth - letterbox.padX) / letterbox.scale;
+      final y2 = (row[3] * inputHeight - letterbox.padY) / letterbox.scale;
+      final classId = row[5].round();
+      
+      detections.add(Detection(
+        bbox: [(x1 + x2) / 2, (y1 + y2) / 2, x2 - x1, y2 - y1],
+        confidence: confidence,
+        classId: classId,
+        className: _labels[classId],
+      ));
+    }
+    
+    return detections;
+  }
+  
   List<Detection> _applyNMS(List<Detection> detections) {
     // Sort by confidence
     detections.sort((a, b) => b.confidence.compareTo(a.confidence));
@@ -484,6 +1119,20 @@ class ExitSignDetectionService {
 }
 
 // Data classes
+class LetterboxResult {
+  final img.Image image;
+  final double scale;
+  final int padX;
+  final int padY;
+  
+  LetterboxResult({
+    required this.image,
+    required this.scale,
+    required this.padX,
+    required this.padY,
+  });
+}
+
 class Detection {
   final List<double> bbox;
   final double confidence;
@@ -535,6 +1184,16 @@ enum SafetyLevel {
 }
 '''
         
+        input_height, input_width = self.input_shape
+        flutter_code = (flutter_code
+                        .replace('__INPUT_WIDTH__', str(input_width))
+                        .replace('__INPUT_HEIGHT__', str(input_height))
+                        .replace('__NUM_ANCHORS__', str(self._num_anchors()))
+                        .replace('__CONFIDENCE_THRESHOLD__', str(self.confidence_threshold))
+                        .replace('__IOU_THRESHOLD__', str(self.iou_threshold))
+                        .replace('__EMBEDDED_NMS__', 'true' if self.embed_nms else 'false')
+                        .replace('__MAX_DETECTIONS__', str(self.max_detections)))
+        
         flutter_service_path = Path('lib/services/exit_sign_detection_service.dart')
         with open(flutter_service_path, 'w') as f:
             f.write(flutter_code.strip())
@@ -549,13 +1208,56 @@ def main():
                        help='YOLOv8 model size')
     parser.add_argument('--epochs', type=int, default=100, help='Number of training epochs')
     parser.add_argument('--batch', type=int, default=16, help='Batch size')
-    parser.add_argument('--imgsz', type=int, default=640, help='Image size')
+    parser.add_argument('--imgsz', type=int, nargs='+', default=[640],
+                       help='Image size, or HEIGHT WIDTH for a rectangular input (e.g. 640 480)')
+    parser.add_argument('--benchmark-shapes', action='store_true',
+                       help='Compare latency and mAP of the requested shape against the square model')
     parser.add_argument('--export-only', action='store_true', help='Only export existing model')
+    parser.add_argument('--profile', action='store_true',
+                       help='Profile exported models per operator and per YOLOv8 layer')
+    parser.add_argument('--profile-runs', type=int, default=100, help='Profiled inference runs')
+    parser.add_argument('--tune-runtime', action='store_true',
+                       help='Tune onnxruntime settings for the exported model on this host')
+    parser.add_argument('--latency-cap', type=float, default=200.0,
+                       help='Maximum p95 latency (ms) accepted by the runtime tuner')
+    parser.add_argument('--embed-nms', action='store_true',
+                       help='Bake box decoding and NMS into the exported ONNX/TFLite graph')
+    parser.add_argument('--max-det', type=int, default=100, help='Detections kept by embedded NMS')
+    parser.add_argument('--incremental', action='store_true',
+                       help='Fine-tune the last best checkpoint on images added since the last run')
+    parser.add_argument('--incremental-epochs', type=int, default=15, help='Incremental fine-tuning epochs')
+    parser.add_argument('--freeze', type=int, default=10, help='Layers frozen during incremental fine-tuning')
+    parser.add_argument('--replay-ratio', type=float, default=2.0,
+                       help='Old images replayed per new image during incremental fine-tuning')
+    parser.add_argument('--kfold', type=int, default=0,
+                       help='Run K-fold cross-validation on the combined train/valid images instead of training')
+    parser.add_argument('--kfold-parallel', type=int, default=None, help='Folds trained concurrently')
+    parser.add_argument('--cpu-procs', type=int, default=1,
+                       help='Train with CPU data parallelism over N local processes')
+    parser.add_argument('--cascade', action='store_true',
+                       help='Also train a low-resolution gate and export a two-stage cascade')
+    parser.add_argument('--gate-imgsz', type=int, default=160, help='Cascade gate image size')
+    parser.add_argument('--gate-epochs', type=int, default=50, help='Cascade gate training epochs')
+    parser.add_argument('--gate-reject', type=float, default=0.15,
+                       help='Gate confidence below which an image has no exit signs')
+    parser.add_argument('--gate-accept', type=float, default=0.6,
+                       help='Gate confidence above which gate detections are trusted')
     
     args = parser.parse_args()
     
+    if len(args.imgsz) not in (1, 2):
+        parser.error('--imgsz takes one value or HEIGHT WIDTH')
+    imgsz = args.imgsz[0] if len(args.imgsz) == 1 else tuple(args.imgsz)
+    
     # Initialize trainer
     trainer = ExitSignTrainer(args.data, args.model)
+    trainer.embed_nms = args.embed_nms
+    trainer.max_detections = args.max_det
+    
+    if args.kfold:
+        trainer.cross_validate(k=args.kfold, epochs=args.epochs, imgsz=max(args.imgsz),
+                               batch_size=args.batch, parallel=args.kfold_parallel)
+        return
     
     if not args.export_only:
         # Setup and validate
@@ -563,14 +1265,39 @@ def main():
         trainer.validate_dataset()
         
         # Train the model
-        trainer.train(epochs=args.epochs, imgsz=args.imgsz, batch_size=args.batch)
+        if args.incremental:
+            trainer.train_incremental(epochs=args.incremental_epochs, imgsz=imgsz, batch_size=args.batch,
+                                      freeze=args.freeze, replay_ratio=args.replay_ratio)
+        elif args.cpu_procs > 1:
+            trainer.train_distributed(args.cpu_procs, epochs=args.epochs, imgsz=imgsz, batch_size=args.batch)
+        else:
+            trainer.train(epochs=args.epochs, imgsz=imgsz, batch_size=args.batch)
         
         # Evaluate performance
         trainer.evaluate()
+        
+        if args.benchmark_shapes and trainer.input_shape[0] != trainer.input_shape[1]:
+            square = max(trainer.input_shape)
+            trainer.benchmark_input_shapes([(square, square), trainer.input_shape])
+        
+        if args.cascade:
+            trainer.cascade_thresholds = {
+                'reject_below': args.gate_reject,
+                'accept_above': args.gate_accept,
+            }
+            trainer.train_cascade_gate(epochs=args.gate_epochs, imgsz=args.gate_imgsz)
+            trainer.benchmark_cascade(split='test')
     
     # Export models for deployment
     exported_models = trainer.export_models()
     
+    if args.profile:
+        trainer.profile_exports(exported_models, runs=args.profile_runs)
+    
+    if args.tune_runtime and 'ONNX' in exported_models:
+        from runtime_tuner import tune
+        tune(exported_models['ONNX'], latency_cap_ms=args.latency_cap)
+    
     # Create safety assessment configuration
     trainer.create_safety_assessment_config()
     